@@ -0,0 +1,262 @@
+"""Benchmarks the merge on synthetic projects, no Resolve needed.
+
+Reports wall time, scripting API calls and peak traced memory per phase.
+
+    python benchmark.py --timelines 20 --clips 300 --sources 100 --latency 0.1
+    python benchmark.py --scale 1,2,4,8 --json bench.json
+    python benchmark.py --plates 1000,10000,100000
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib.util
+import tempfile
+import tracemalloc
+from pathlib import Path
+from contextlib import contextmanager
+
+import main
+import fake_resolve
+
+
+class PhaseRecorder:
+    def __init__(self, stats: fake_resolve.CallStats) -> None:
+        self.stats = stats
+        self.phases: list[dict] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        calls = self.stats.total
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - current
+            self.phases.append(
+                {
+                    "phase": name,
+                    "seconds": round(seconds, 4),
+                    "api_calls": self.stats.total - calls,
+                    "peak_mb": round(max(peak, 0) / pow(1024, 2), 3),
+                }
+            )
+
+
+def run(args: argparse.Namespace, scale: int = 1) -> dict:
+    project = fake_resolve.generate_project(
+        timelines=args.timelines * scale,
+        clips=args.clips,
+        sources=args.sources * scale,
+        tracks=args.tracks,
+        seed=args.seed,
+        latency=args.latency / 1000.0,
+    )
+    bmd = fake_resolve.FakeBmd(project)
+    main.bmd = bmd
+
+    merger = main.Merger(None)
+    merger.timeline_filter = "^cut_"
+    merger.timeline_out = "merged"
+    merger.gapsize = args.gap
+    merger.scan_workers = args.workers
+    merger.append_chunk_size = args.chunk_size
+    merger.columnar_threshold = args.columnar_threshold
+    merger.color_to_skip = "Orange"
+    merger.tracks_to_skip = ["reference"]
+
+    recorder = PhaseRecorder(bmd.stats)
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            merger.scan_cache_dir = tmp if args.scan_cache else None
+            merger.source_store_path = Path(tmp) / "sources.sqlite"
+            with recorder.phase("scan"):
+                pmanager, snapshot = merger.scan()
+            with recorder.phase("compute"):
+                result = merger.compute(snapshot)
+            with recorder.phase("create timeline"):
+                merger.create_timeline(pmanager, snapshot, result)
+            with recorder.phase("preview gap 0"):
+                merger.gapsize = 0
+                merger.preview()
+                merger.gapsize = args.gap
+            with recorder.phase("rescan"):
+                merger.scan()
+            # a later run: fresh source cache, fingerprints loaded from disk again
+            merger.source_cache = main.SourceCache()
+            merger.scan_cache_dir = merger.scan_cache_dir
+            with recorder.phase("rescan next run"):
+                merger.scan()
+            # every timeline read again, sources come from the source store
+            merger.source_cache = main.SourceCache()
+            merger.scan_cache_dir = None
+            with recorder.phase("rescan no cache"):
+                merger.scan()
+            merger.source_store_path = None
+
+            path = Path(tmp) / "snapshot.json.gz"
+            with recorder.phase("snapshot dump"):
+                snapshot.dump(path)
+            with recorder.phase("snapshot load"):
+                main.ProjectSnapshot.load(path)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "project": project.name,
+        "items": sum(len(tl.clips) for tl in snapshot.timelines),
+        "sources": len(snapshot.sources),
+        "clip_infos": len(result),
+        "api_calls": dict(bmd.stats.counts.most_common()),
+        "phases": recorder.phases,
+    }
+
+
+def load_script(bmd: fake_resolve.FakeBmd):
+    """Runs resolve_merge_timelines.py the way Resolve does, with `bmd` injected."""
+    path = Path(__file__).with_name("resolve_merge_timelines.py")
+    spec = importlib.util.spec_from_file_location("resolve_merge_timelines", path)
+    module = importlib.util.module_from_spec(spec)
+    module.bmd = bmd
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_plates(args: argparse.Namespace, plates: int) -> dict:
+    """The plate merge of resolve_merge_timelines.py on `plates` timeline items."""
+    timelines = min(args.timelines, plates)
+    project = fake_resolve.generate_project(
+        timelines=timelines,
+        clips=plates // timelines,
+        sources=args.sources,
+        tracks=args.tracks,
+        seed=args.seed,
+        latency=args.latency / 1000.0,
+        # its fps_mapping only knows a few of Resolve's frame rate strings
+        mixed_rates=False,
+    )
+    bmd = fake_resolve.FakeBmd(project)
+    resolve_merge_timelines = load_script(bmd)
+    # only count what the phases below call
+    bmd.stats.reset()
+
+    prj = resolve_merge_timelines.ResolveProject()
+    recorder = PhaseRecorder(bmd.stats)
+    tracemalloc.start()
+    try:
+        with recorder.phase("inventory"):
+            prj.filter_timelines("cut_")
+        with recorder.phase("get plates"):
+            prj.get_plates(skip_color=None)
+        with recorder.phase("group plates"):
+            prj.split_plates_by_reel("pool_file_name")
+        with recorder.phase("merge plates"):
+            prj.merge_plates(args.gap)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "project": project.name,
+        "items": len(prj.plates),
+        "sources": len(prj.plate_groups),
+        "clip_infos": sum(len(v) for v in prj.merge_summary.values()),
+        "api_calls": dict(bmd.stats.counts.most_common()),
+        "phases": recorder.phases,
+    }
+
+
+def print_scaling(reports: list[dict]):
+    """Time per plate of each phase, flat rows mean linear scaling."""
+    phases = [p["phase"] for p in reports[0]["phases"]]
+    print(f"\n{'plates':>10}" + "".join(f"{p + ' us':>18}" for p in phases))
+    for report in reports:
+        per_plate = [
+            p["seconds"] / max(report["items"], 1) * 1e6 for p in report["phases"]
+        ]
+        print(f"{report['items']:>10}" + "".join(f"{us:>18.2f}" for us in per_plate))
+
+
+def print_report(report: dict):
+    print(
+        f"\n{report['project']}: {report['items']} items, "
+        f"{report['sources']} sources -> {report['clip_infos']} clips"
+    )
+    print(f"{'phase':<18}{'seconds':>10}{'api calls':>12}{'peak MB':>10}")
+    for p in report["phases"]:
+        print(
+            f"{p['phase']:<18}{p['seconds']:>10.3f}"
+            f"{p['api_calls']:>12}{p['peak_mb']:>10.2f}"
+        )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timelines", type=int, default=10)
+    parser.add_argument("--clips", type=int, default=200, help="clips per timeline")
+    parser.add_argument("--sources", type=int, default=50)
+    parser.add_argument("--tracks", type=int, default=3)
+    parser.add_argument("--gap", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="milliseconds per API call"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="threads scanning timelines"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=500, help="clip infos per append call"
+    )
+    parser.add_argument(
+        "--columnar-threshold",
+        type=int,
+        default=100_000,
+        help="timeline items from which usages are kept in int64 columns",
+    )
+    parser.add_argument(
+        "--no-scan-cache",
+        dest="scan_cache",
+        action="store_false",
+        help="read every timeline on every scan",
+    )
+    parser.add_argument(
+        "--scale",
+        default="1",
+        help="comma separated multipliers for timelines and sources",
+    )
+    parser.add_argument(
+        "--plates",
+        help="comma separated plate counts, benchmarks resolve_merge_timelines.py instead",
+    )
+    parser.add_argument("--json", type=Path, help="also write the reports here")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    args = parse_args(argv)
+    main.log.setLevel(logging.WARNING)
+
+    reports = []
+    if args.plates:
+        for plates in [int(i) for i in args.plates.split(",")]:
+            report = run_plates(args, plates)
+            print_report(report)
+            reports.append(report)
+        print_scaling(reports)
+    else:
+        for scale in [int(i) for i in args.scale.split(",")]:
+            report = run(args, scale)
+            print_report(report)
+            reports.append(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
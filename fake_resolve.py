@@ -0,0 +1,456 @@
+"""In-process stand-in for the parts of the Resolve scripting API we use.
+
+Every API method counts its calls and can sleep for a configurable latency,
+roughly like the IPC round-trip to a running Resolve.
+
+    import main, fake_resolve
+    project = fake_resolve.generate_project(timelines=20, clips=300, sources=100)
+    main.bmd = fake_resolve.FakeBmd(project)
+"""
+import time
+import random
+import threading
+import functools
+from collections import Counter
+
+
+class CallStats:
+    """Per method call counter, optionally adding latency to every call."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.counts = Counter()
+        self.__lock = threading.Lock()
+
+    def record(self, name: str):
+        with self.__lock:
+            self.counts[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def reset(self):
+        with self.__lock:
+            self.counts.clear()
+
+
+def api(func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._stats.record(func.__name__)
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class FakeMediaPoolItem:
+    def __init__(self, stats: CallStats, uid: str, name: str, props: dict) -> None:
+        self._stats = stats
+        self.uid = uid
+        self.name = name
+        self.props = props
+        self.metadata = {}
+
+    @api
+    def GetUniqueId(self):
+        return self.uid
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def GetClipProperty(self, key=None):
+        if key is None:
+            return dict(self.props)
+        return self.props.get(key, "")
+
+    @api
+    def GetMetadata(self, key=None):
+        if key is None:
+            return dict(self.metadata)
+        return self.metadata.get(key, "")
+
+
+class FakeTimelineItem:
+    def __init__(
+        self,
+        stats: CallStats,
+        uid: str,
+        mpi: FakeMediaPoolItem,
+        start: int,
+        left_offset: int,
+        duration: int,
+        color: str = "",
+    ) -> None:
+        self._stats = stats
+        self.uid = uid
+        self.mpi = mpi
+        self.start = start
+        self.left_offset = left_offset
+        self.duration = duration
+        self.color = color
+
+    @api
+    def GetUniqueId(self):
+        return self.uid
+
+    @api
+    def GetName(self):
+        return self.mpi.name if self.mpi else "Solid Color"
+
+    @api
+    def GetStart(self):
+        return self.start
+
+    @api
+    def GetEnd(self):
+        return self.start + self.duration
+
+    @api
+    def GetDuration(self):
+        return self.duration
+
+    @api
+    def GetLeftOffset(self):
+        return self.left_offset
+
+    @api
+    def GetRightOffset(self):
+        # resolve returns the source frame the item ends at, not a tail offset
+        return self.left_offset + self.duration
+
+    @api
+    def GetClipColor(self):
+        return self.color
+
+    @api
+    def GetMediaPoolItem(self):
+        return self.mpi
+
+    @api
+    def GetProperty(self, key=None):
+        props = {"Pan": 0.0, "Tilt": 0.0, "ZoomX": 1.0, "ZoomY": 1.0}
+        if key is None:
+            return props
+        return props.get(key)
+
+
+class FakeTimeline:
+    def __init__(
+        self,
+        stats: CallStats,
+        name: str,
+        fps: str = "24",
+        drop_frame: bool = False,
+        start_frame: int = 86400,
+    ) -> None:
+        self._stats = stats
+        self.name = name
+        self.settings = {
+            "timelineFrameRate": fps,
+            "timelineDropFrameTimecode": "1" if drop_frame else "0",
+        }
+        self.start_frame = start_frame
+        self.tracks: list[tuple[str, list[FakeTimelineItem]]] = []
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def GetStartFrame(self):
+        return self.start_frame
+
+    @api
+    def GetEndFrame(self):
+        ends = [i.start + i.duration for _, items in self.tracks for i in items]
+        return max(ends, default=self.start_frame)
+
+    @api
+    def GetSetting(self, key=None):
+        if key is None:
+            return dict(self.settings)
+        return self.settings.get(key, "")
+
+    @api
+    def GetTrackCount(self, track_type):
+        return len(self.tracks) if track_type == "video" else 0
+
+    @api
+    def GetTrackName(self, track_type, index):
+        return self.tracks[index - 1][0]
+
+    @api
+    def GetItemListInTrack(self, track_type, index):
+        return list(self.tracks[index - 1][1])
+
+    @api
+    def GetMarkers(self):
+        return {}
+
+    @api
+    def GetCurrentVideoItem(self):
+        return None
+
+
+class FakeMediaPool:
+    """AppendToTimeline handles broken clip infos according to `append_mode`.
+
+    "reject" appends nothing if any clip info is broken, "drop" appends all
+    others, "raise" appends the ones before the first broken one and raises.
+    """
+
+    def __init__(self, stats: CallStats, project: "FakeProject") -> None:
+        self._stats = stats
+        self.project = project
+        self.appended: list[dict] = []
+        self.append_mode = "reject"
+
+    @api
+    def CreateEmptyTimeline(self, name):
+        timeline = FakeTimeline(self._stats, name)
+        timeline.tracks.append(("Video 1", []))
+        self.project.timelines.append(timeline)
+        self.project.current_timeline = timeline
+        return timeline
+
+    @api
+    def AppendToTimeline(self, clip_infos):
+        timeline = self.project.current_timeline
+        items = timeline.tracks[0][1]
+
+        def broken(info):
+            return info["mediaPoolItem"] is None or info["startFrame"] > info["endFrame"]
+
+        if self.append_mode == "reject" and any(broken(i) for i in clip_infos):
+            return []
+        result = []
+        for info in clip_infos:
+            if broken(info):
+                if self.append_mode == "raise":
+                    raise RuntimeError("broken clip info", info)
+                continue
+            duration = info["endFrame"] - info["startFrame"] + 1
+            start = items[-1].start + items[-1].duration if items else 86400
+            item = FakeTimelineItem(
+                self._stats,
+                f"appended-{len(self.appended)}",
+                info["mediaPoolItem"],
+                start,
+                info["startFrame"],
+                duration,
+            )
+            items.append(item)
+            self.appended.append(info)
+            result.append(item)
+        return result
+
+
+class FakeProject:
+    def __init__(self, stats: CallStats, name: str = "synthetic") -> None:
+        self._stats = stats
+        self.name = name
+        self.timelines: list[FakeTimeline] = []
+        self.current_timeline: FakeTimeline = None
+        self.mediapool = FakeMediaPool(stats, self)
+
+    @api
+    def GetName(self):
+        return self.name
+
+    @api
+    def GetTimelineCount(self):
+        return len(self.timelines)
+
+    @api
+    def GetTimelineByIndex(self, index):
+        return self.timelines[index - 1]
+
+    @api
+    def GetCurrentTimeline(self):
+        return self.current_timeline
+
+    @api
+    def GetMediaPool(self):
+        return self.mediapool
+
+
+class FakeProjectManager:
+    def __init__(self, stats: CallStats, project: FakeProject) -> None:
+        self._stats = stats
+        self.project = project
+
+    @api
+    def GetCurrentProject(self):
+        return self.project
+
+    @api
+    def GetCurrentFolder(self):
+        return "synthetic"
+
+
+class FakeResolve:
+    def __init__(self, stats: CallStats, project: FakeProject) -> None:
+        self._stats = stats
+        self.manager = FakeProjectManager(stats, project)
+
+    @api
+    def GetProjectManager(self):
+        return self.manager
+
+
+class FakeUIElement:
+    """Accepts any Fusion UI call, so scripts can build their UI headless.
+
+    Windows, widgets, events and dispatchers are all elements. Unknown
+    attributes and items are new elements, calling one returns another.
+    """
+
+    defaults = {"Text": "", "CurrentText": "", "Checked": False, "Value": 0}
+
+    def __init__(self) -> None:
+        self.__dict__["_children"] = {}
+
+    def __getattr__(self, name):
+        if name in self.defaults:
+            return self.defaults[name]
+        return self._children.setdefault(name, FakeUIElement())
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+    def __setitem__(self, name, value):
+        self._children[name] = value
+
+    def __call__(self, *args, **kwargs):
+        return FakeUIElement()
+
+
+class FakeFusion:
+    def __init__(self) -> None:
+        self.UIManager = FakeUIElement()
+
+
+class FakeBmd:
+    """Replaces the `bmd` global Resolve injects into scripts."""
+
+    def __init__(self, project: FakeProject) -> None:
+        self.project = project
+        self.stats = project._stats
+        self.resolve = FakeResolve(self.stats, project)
+        self.fusion = FakeFusion()
+
+    def scriptapp(self, name):
+        if name == "Resolve":
+            return self.resolve
+        if name == "Fusion":
+            return self.fusion
+        raise NotImplementedError(f"no fake for {name}")
+
+    def UIDispatcher(self, ui):
+        # RunLoop returns right away, nothing is shown
+        return FakeUIElement()
+
+
+# (Resolve "FPS" clip property, timeline frame rate setting, drop frame)
+frame_rates = [
+    ("23.976", "23.976", False),
+    ("24", "24", False),
+    ("25", "25", False),
+    ("29.97", "29.97", True),
+    ("30", "30", False),
+    ("50", "50", False),
+    ("59.94", "59.94", True),
+]
+
+
+def frames_to_tc(frames: int, fps: float, drop_frame: bool = False) -> str:
+    """Good enough timecode strings for the fake, not frame accurate for DF."""
+    base = int(round(fps))
+    hr, rest = divmod(frames, base * 3600)
+    mn, rest = divmod(rest, base * 60)
+    sc, fr = divmod(rest, base)
+    return f"{hr % 24:02d}:{mn:02d}:{sc:02d}{';' if drop_frame else ':'}{fr:02d}"
+
+
+def generate_project(
+    timelines: int = 10,
+    clips: int = 200,
+    sources: int = 50,
+    tracks: int = 3,
+    seed: int = 0,
+    latency: float = 0.0,
+    mixed_rates: bool = True,
+) -> FakeProject:
+    """N timelines x M clips per timeline, cut from K sources.
+
+    Sources are reused with a skewed distribution like stock plates, their
+    frame rates (incl. drop frame) are mixed unless `mixed_rates` is off.
+    The last track of every timeline is called "reference".
+    """
+    rnd = random.Random(seed)
+    stats = CallStats(latency)
+    project = FakeProject(stats, f"synthetic_{timelines}x{clips}x{sources}")
+
+    pool = []
+    for k in range(sources):
+        fps_name, _, drop_frame = (
+            rnd.choice(frame_rates) if mixed_rates else frame_rates[1]
+        )
+        fps = float(fps_name)
+        head = rnd.randint(1, 20) * int(round(fps)) * 3600 + rnd.randint(0, 10000)
+        length = rnd.randint(2, 40) * int(round(fps)) * 60
+        name = f"A{k // 20:03d}C{k % 20:03d}"
+        props = {
+            "Clip Name": name,
+            "File Name": f"{name}.mov",
+            "File Path": f"/media/{name[:4]}/{name}.mov",
+            "Reel Name": name[:4],
+            "FPS": fps_name,
+            "Start TC": frames_to_tc(head, fps, drop_frame),
+            "End TC": frames_to_tc(head + length, fps, drop_frame),
+            "Frames": str(length),
+        }
+        pool.append(FakeMediaPoolItem(stats, f"mpi-{k:06d}", name, props))
+
+    weights = [1.0 / (k + 1) for k in range(sources)]
+    colors = ["", "", "", "Orange", "Blue", "Green"]
+    per_track = max(1, clips // tracks)
+    for t in range(timelines):
+        fps_name, tl_fps, drop_frame = (
+            rnd.choice(frame_rates) if mixed_rates else frame_rates[1]
+        )
+        timeline = FakeTimeline(stats, f"cut_v{t:03d}", tl_fps, drop_frame)
+        for n in range(tracks):
+            if n == tracks - 1 and tracks > 1:
+                track_name = "reference"
+            else:
+                track_name = f"Video {n + 1}"
+            items = []
+            pos = timeline.start_frame
+            for i in range(per_track):
+                mpi = rnd.choices(pool, weights)[0] if rnd.random() > 0.02 else None
+                duration = rnd.randint(12, 240)
+                length = int(mpi.props["Frames"]) if mpi else duration
+                left = rnd.randint(0, max(0, length - duration))
+                items.append(
+                    FakeTimelineItem(
+                        stats,
+                        f"item-{t:04d}-{n:02d}-{i:06d}",
+                        mpi,
+                        pos,
+                        left,
+                        duration,
+                        rnd.choice(colors),
+                    )
+                )
+                pos += duration
+            timeline.tracks.append((track_name, items))
+        project.timelines.append(timeline)
+
+    stats.reset()
+    return project
@@ -1,9 +1,34 @@
 import os
 import re
 import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import hashlib
+import cProfile
+import reprlib
+import sqlite3
 import logging
-from logging.handlers import RotatingFileHandler
+import tracemalloc
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    # Resolve's python usually comes without numpy, everything works without it
+    np = None
 
 clipcolor_names = [
     "Orange",
@@ -26,43 +51,74 @@ clipcolor_names = [
 
 
 class TC:
-    """Frames to SMPTE timecode converter and reverse."""
-
-    # ! everything in here should be classmethods,vars since we don't need to instantiate an object ever
+    """Frames to SMPTE timecode converter and reverse, for one frame rate.
+
+    Converters hold no mutable state besides a parse cache, share them with
+    TC.get(fps, drop_frame) instead of creating new ones.
+    """
+
+    __slots__ = (
+        "fps",
+        "is_dropframe",
+        "time_base",
+        "drop_frames",
+        "frames_per_hour",
+        "frames_per_minute",
+        "frames_per_10_minutes",
+        "frames_per_24_hours",
+        "frames_per_dropframe_minute",
+        "__frames_cache",
+    )
 
-    __fps = 24.0
-    __is_dropframe = False
+    __registry: dict = {}
+    # a project has a handful of distinct Start TCs, this is just a safety net
+    frames_cache_size = 4096
 
-    @classmethod
-    def get_fps(cls) -> float:
-        return cls.__fps
+    def __init__(self, fps: float = 24.0, is_dropframe: bool = False) -> None:
+        if not isinstance(fps, (float, int)):
+            raise RuntimeError(f"{fps} must be of type float. {type(fps)} != float")
+        if not isinstance(is_dropframe, bool):
+            raise RuntimeError(
+                f"{is_dropframe} must be of type bool. {type(is_dropframe)} != bool"
+            )
+        self.fps = float(fps)
+        self.is_dropframe = is_dropframe
 
-    @classmethod
-    def set_fps(cls, para: float):
-        if not isinstance(para, (float, int)):
-            raise RuntimeError(f"{para} must be of type bool. {type(para)} != float")
-        cls.__fps = float(para)
-        log.debug(f"Set internal FPS to {cls.__fps}")
+        # Drop frame constants using the Duncan/Heidelberger method.
+        self.time_base = int(round(self.fps))
+        self.drop_frames = int(round(self.fps * 0.066666))
+        self.frames_per_hour = self.time_base * 3600
+        self.frames_per_minute = self.time_base * 60
+        self.frames_per_10_minutes = int(round(self.fps * 600))
+        self.frames_per_24_hours = int(round(self.fps * 3600)) * 24
+        self.frames_per_dropframe_minute = int(self.time_base * 60 - self.drop_frames)
 
-    @classmethod
-    def get_is_dropframe(cls) -> bool:
-        return cls.__is_dropframe
+        self.__frames_cache: dict[str, int] = {}
 
-    @classmethod
-    def set_is_dropframe(cls, para):
-        if not isinstance(para, bool):
-            raise RuntimeError(f"{para} must be of type bool. {type(para)} != bool")
-        cls.__is_dropframe = para
+    def __repr__(self) -> str:
+        return f"TC({self.fps}, {self.is_dropframe})"
 
     @classmethod
-    def get_frames(cls, tc: str) -> int:
+    def get(cls, fps: float, is_dropframe: bool = False) -> "TC":
+        """Shared converter for the given frame rate."""
+        key = (float(fps), bool(is_dropframe))
+        converter = cls.__registry.get(key)
+        if converter is None:
+            converter = cls.__registry.setdefault(key, cls(*key))
+        return converter
+
+    def get_frames(self, tc: str) -> int:
         """Converts SMPTE timecode to frame count."""
 
         if not tc or tc == "":
             return None
 
-        if int(tc[9:]) > cls.__fps:
-            raise ValueError("SMPTE timecode to frame rate mismatch.", tc, cls.__fps)
+        frm = self.__frames_cache.get(tc)
+        if frm is not None:
+            return frm
+
+        if int(tc[9:]) > self.fps:
+            raise ValueError("SMPTE timecode to frame rate mismatch.", tc, self.fps)
 
         hours = int(tc[:2])
         minutes = int(tc[3:5])
@@ -71,94 +127,881 @@ class TC:
 
         totalMinutes = int(60 * hours + minutes)
 
+        frm = int(
+            (self.frames_per_hour * hours)
+            + (self.frames_per_minute * minutes)
+            + (self.time_base * seconds)
+            + frames
+        )
         # Drop frame calculation using the Duncan/Heidelberger method.
-        if cls.__is_dropframe:
-            dropFrames = int(round(cls.__fps * 0.066666))
-            timeBase = int(round(cls.__fps))
-            hourFrames = int(timeBase * 60 * 60)
-            minuteFrames = int(timeBase * 60)
-            frm = int(
-                (
-                    (hourFrames * hours)
-                    + (minuteFrames * minutes)
-                    + (timeBase * seconds)
-                    + frames
-                )
-                - (dropFrames * (totalMinutes - (totalMinutes // 10)))
-            )
-        # Non drop frame calculation.
-        else:
-            __fps = int(round(cls.__fps))
-            frm = int((totalMinutes * 60 + seconds) * __fps + frames)
+        if self.is_dropframe:
+            frm -= self.drop_frames * (totalMinutes - (totalMinutes // 10))
 
+        if len(self.__frames_cache) >= self.frames_cache_size:
+            self.__frames_cache.clear()
+        self.__frames_cache[tc] = frm
         return frm
 
-    @classmethod
-    def get_tc(cls, frames: int) -> str:
+    def get_tc(self, frames: int) -> str:
         """Converts frame count to SMPTE timecode."""
+        return self.get_tc_batch([frames])[0]
+
+    def get_frames_batch(self, tcs) -> list[int]:
+        """Converts many SMPTE timecodes to frame counts in one pass.
+
+        Same results as get_frames, empty timecodes give None.
+        """
+        tcs = [str(tc) if tc else "" for tc in tcs]
+        if np is not None and tcs and all(len(tc) == 11 for tc in tcs):
+            digits = np.frombuffer("".join(tcs).encode("ascii"), dtype=np.uint8)
+            digits = digits.reshape(-1, 11)[:, [0, 1, 3, 4, 6, 7, 9, 10]]
+            digits = digits.astype(np.int64) - ord("0")
+            # anything else than digits goes the slow way and raises there
+            if ((digits >= 0) & (digits <= 9)).all():
+                return self.__get_frames_np(tcs, digits)
+
+        return [self.get_frames(tc) for tc in tcs]
+
+    def __get_frames_np(self, tcs: list[str], digits) -> list[int]:
+        hours, minutes, seconds, frames = (digits[:, 0::2] * 10 + digits[:, 1::2]).T
+        too_big = np.flatnonzero(frames > self.fps)
+        if too_big.size:
+            tc = tcs[too_big[0]]
+            raise ValueError("SMPTE timecode to frame rate mismatch.", tc, self.fps)
+
+        total_minutes = 60 * hours + minutes
+        result = (total_minutes * 60 + seconds) * self.time_base + frames
+        if self.is_dropframe:
+            result -= self.drop_frames * (total_minutes - (total_minutes // 10))
+        return result.tolist()
+
+    def get_tc_batch(self, frames) -> list[str]:
+        """Converts many frame counts to SMPTE timecodes in one pass.
+
+        Same results as get_tc.
+        """
+        if not hasattr(frames, "__len__"):
+            frames = list(frames)
+        if np is not None and len(frames) > 1:
+            frm = np.abs(np.asarray(frames, dtype=np.int64))
+            fields = zip(*(i.tolist() for i in self.__tc_fields(frm, np.where)))
+        else:
+            fields = (self.__tc_fields(abs(int(f)), _where) for f in frames)
+
+        # Return SMPTE timecode strings.
+        pattern = "%02d:%02d:%02d;%02d" if self.is_dropframe else "%02d:%02d:%02d:%02d"
+        return [pattern % f for f in fields]
 
-        frames = abs(frames)
+    def __tc_fields(self, frames, where):
+        """(hours, minutes, seconds, frames) of an int or an int array."""
+        time_base = self.time_base
 
         # Drop frame calculation using the Duncan/Heidelberger method.
-        if cls.__is_dropframe:
-            spacer = ":"
-            spacer2 = ";"
-
-            dropFrames = int(round(cls.__fps * 0.066666))
-            framesPerHour = int(round(cls.__fps * 3600))
-            framesPer24Hours = framesPerHour * 24
-            framesPer10Minutes = int(round(cls.__fps * 600))
-            framesPerMinute = int(round(cls.__fps) * 60 - dropFrames)
-
-            frames = frames % framesPer24Hours
-
-            d = frames // framesPer10Minutes
-            m = frames % framesPer10Minutes
-
-            if m > dropFrames:
-                frames = (
-                    frames
-                    + (dropFrames * 9 * d)
-                    + dropFrames * ((m - dropFrames) // framesPerMinute)
-                )
-            else:
-                frames = frames + dropFrames * 9 * d
+        if self.is_dropframe:
+            drop_frames = self.drop_frames
+            frames = frames % self.frames_per_24_hours
+
+            d = frames // self.frames_per_10_minutes
+            m = frames % self.frames_per_10_minutes
+
+            per_minute = self.frames_per_dropframe_minute
+            frames = (
+                frames
+                + (drop_frames * 9 * d)
+                + where(m > drop_frames, drop_frames * ((m - drop_frames) // per_minute), 0)
+            )
 
-            frRound = int(round(cls.__fps))
-            hr = int(frames // frRound // 60 // 60)
-            mn = int((frames // frRound // 60) % 60)
-            sc = int((frames // frRound) % 60)
-            fr = int(frames % frRound)
+            return (
+                frames // time_base // 60 // 60,
+                (frames // time_base // 60) % 60,
+                (frames // time_base) % 60,
+                frames % time_base,
+            )
 
         # Non drop frame calculation.
+        hr = frames // self.frames_per_hour
+        frames = frames - hr * self.frames_per_hour
+        mn = frames // self.frames_per_minute
+        frames = frames - mn * self.frames_per_minute
+        sc = frames // time_base
+        return hr, mn, sc, frames - sc * time_base
+
+
+def _where(condition, a, b):
+    """Scalar stand-in for numpy.where."""
+    return a if condition else b
+
+
+class SourceRecord(NamedTuple):
+    """Media pool item as read once by the snapshot stage."""
+
+    id: str
+    name: str
+    fps: float
+    start_tc: str
+    end_tc: str
+    file_name: str
+    reel_name: str
+    file_path: str
+
+    @property
+    def drop_frame(self) -> bool:
+        return ";" in str(self.start_tc)
+
+    @property
+    def tc(self) -> TC:
+        return TC.get(self.fps, self.drop_frame)
+
+    @property
+    def head_in(self) -> int:
+        return self.tc.get_frames(str(self.start_tc))
+
+
+class ClipRecord(NamedTuple):
+    """Timeline item as read once by the snapshot stage."""
+
+    id: str
+    name: str
+    track: str
+    edit_in: int
+    edit_out: int
+    left_offset: int
+    right_offset: int
+    color: str
+    source_id: str
+
+    def usage(self, head_in: int) -> tuple[int, int]:
+        """Source in/out frames, same as DVR_Clip.src_in/src_out."""
+        src_in = head_in + self.left_offset
+        return (src_in, src_in + self.right_offset - self.left_offset)
+
+
+class TimelineRecord(NamedTuple):
+    """Timeline with all of its video items, read once by the snapshot stage."""
+
+    name: str
+    framerate: float
+    drop_frame: bool
+    start_frame: int
+    end_frame: int
+    tracks: tuple[str, ...]
+    clips: tuple[ClipRecord, ...]
+
+
+class SourceStore:
+    """SourceRecords of earlier runs and other projects, in a SQLite file.
+
+    Keyed by path, size and modification time of the media file, or by the
+    MediaPoolItem's unique id if the file can't be read from here, plus the
+    pool item's own Start and End TC, which subclips and clip attribute
+    overrides change. Records older than `ttl` seconds are ignored, `purge`
+    deletes them.
+    """
+
+    store_version = 3
+    path: Path = Path.home() / ".cache" / "merge_timelines" / "sources.sqlite"
+    ttl: float = float(os.environ.get("DVR_SOURCE_STORE_DAYS", "30")) * 86400
+    # host parameters per query, SQLite allows 999 in older builds
+    batch_size = 500
+
+    def __init__(self, path=None, ttl: float = None) -> None:
+        self.path = Path(path or self.path)
+        if ttl is not None:
+            self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # one connection shared by the scan threads, guarded by the lock
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(self.path, check_same_thread=False)
+        self.__fields = SourceRecord._fields[1:]
+        with self.__lock, self.__db:
+            version = self.__db.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.store_version:
+                self.__db.execute("DROP TABLE IF EXISTS sources")
+                self.__db.execute(f"PRAGMA user_version = {self.store_version}")
+            columns = ", ".join(self.__fields)
+            self.__db.execute(
+                "CREATE TABLE IF NOT EXISTS sources"
+                f" (key TEXT PRIMARY KEY, {columns}, stored REAL)"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    # fields of the pool item itself that go into its key
+    item_keys = ("Start TC", "End TC")
+
+    @classmethod
+    def key(cls, source: "DVR_SourceClip", src_id: str) -> str:
+        item = ":".join(str(source.get_property(k)) for k in cls.item_keys)
+        file_path = source.get_property("File Path")
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError, ValueError):
+            return f"id:{src_id}:{item}"
+        return f"file:{file_path}:{stat.st_size}:{stat.st_mtime_ns}:{item}"
+
+    def get_many(self, keys) -> dict[str, SourceRecord]:
+        """Records per key of the ones stored and not expired, ids left empty."""
+        keys = list(dict.fromkeys(keys))
+        oldest = time.time() - self.ttl
+        result = {}
+        try:
+            with self.__lock:
+                for i in range(0, len(keys), self.batch_size):
+                    batch = keys[i : i + self.batch_size]
+                    marks = ", ".join("?" * len(batch))
+                    rows = self.__db.execute(
+                        f"SELECT key, {', '.join(self.__fields)} FROM sources"
+                        f" WHERE stored >= ? AND key IN ({marks})",
+                        (oldest, *batch),
+                    )
+                    for key, *fields in rows:
+                        result[key] = SourceRecord("", *fields)
+        except sqlite3.Error as err:
+            log.warning("source store lookup failed: %s", err)
+        self.hits += len(result)
+        self.misses += len(keys) - len(result)
+        return result
+
+    def put_many(self, records: dict[str, SourceRecord]):
+        if not records:
+            return
+        now = time.time()
+        rows = [(key, *record[1:], now) for key, record in records.items()]
+        marks = ", ".join("?" * (len(self.__fields) + 2))
+        try:
+            with self.__lock, self.__db:
+                self.__db.executemany(
+                    f"INSERT OR REPLACE INTO sources VALUES ({marks})", rows
+                )
+        except sqlite3.Error as err:
+            log.warning("source store update failed: %s", err)
+
+    def purge(self, everything: bool = False, by_id: bool = False) -> int:
+        """Deletes expired records, or all of them, returns how many.
+
+        `by_id` also drops the records of files that couldn't be read, they
+        go stale when media is relinked.
+        """
+        oldest = time.time() - self.ttl
+        if everything:
+            query, args = "DELETE FROM sources", ()
+        elif by_id:
+            query = "DELETE FROM sources WHERE stored < ? OR key LIKE 'id:%'"
+            args = (oldest,)
         else:
-            __fps = int(round(cls.__fps))
-            spacer = ":"
-            spacer2 = spacer
-
-            frHour = __fps * 3600
-            frMin = __fps * 60
-
-            hr = int(frames // frHour)
-            mn = int((frames - hr * frHour) // frMin)
-            sc = int((frames - hr * frHour - mn * frMin) // __fps)
-            fr = int(round(frames - hr * frHour - mn * frMin - sc * __fps))
-
-        # Return SMPTE timecode string.
-        return (
-            str(hr).zfill(2)
-            + spacer
-            + str(mn).zfill(2)
-            + spacer
-            + str(sc).zfill(2)
-            + spacer2
-            + str(fr).zfill(2)
-        )
+            query, args = "DELETE FROM sources WHERE stored < ?", (oldest,)
+        with self.__lock, self.__db:
+            return self.__db.execute(query, args).rowcount
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+    @property
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class SourceCache:
+    """Bounded LRU of SourceRecords keyed by the MediaPoolItem's unique id.
+
+    The same source is usually cut into many timelines, so its properties
+    are only fetched from Resolve on the first lookup. With a SourceStore,
+    sources known from earlier runs only need the fields of their key read.
+    """
+
+    def __init__(self, maxsize: int = 4096, store: SourceStore = None) -> None:
+        self.__records: OrderedDict[str, SourceRecord] = OrderedDict()
+        self.__maxsize = maxsize
+        self.store = store
+        # timelines may be scanned from several threads
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    @property
+    def maxsize(self) -> int:
+        return self.__maxsize
+
+    def get(self, source: "DVR_SourceClip", src_id: str = None) -> SourceRecord:
+        src_id = src_id or source.id
+        return self.get_many({src_id: source})[src_id]
+
+    def get_many(self, sources: dict[str, "DVR_SourceClip"]) -> dict[str, SourceRecord]:
+        """Records per source id, the store is asked for all misses at once."""
+        result = {}
+        missing = {}
+        with self.__lock:
+            for src_id, source in sources.items():
+                record = self.__records.get(src_id)
+                if record is not None:
+                    self.__records.move_to_end(src_id)
+                    self.hits += 1
+                    result[src_id] = record
+                else:
+                    self.misses += 1
+                    missing[src_id] = source
+        if not missing:
+            return result
+
+        # outside of the lock, other threads shouldn't wait for our API calls
+        fetched = self.__fetch(missing)
+        with self.__lock:
+            for src_id, record in fetched.items():
+                self.__records[src_id] = record
+            while len(self.__records) > self.__maxsize:
+                self.__records.popitem(last=False)
+        result.update(fetched)
+        return result
+
+    def __fetch(self, sources: dict[str, "DVR_SourceClip"]) -> dict[str, SourceRecord]:
+        if self.store is None:
+            return {src_id: s.snapshot(src_id) for src_id, s in sources.items()}
+
+        keys = {
+            src_id: self.store.key(source, src_id)
+            for src_id, source in sources.items()
+        }
+        stored = self.store.get_many(keys.values())
+        result, new = {}, {}
+        for src_id, source in sources.items():
+            record = stored.get(keys[src_id])
+            if record is None:
+                record = new[keys[src_id]] = source.snapshot(src_id)
+            result[src_id] = record._replace(id=src_id)
+        self.store.put_many(new)
+        return result
+
+    def invalidate(self, src_id: str = None):
+        """Drops one source, or everything if no id is given."""
+        with self.__lock:
+            if src_id is None:
+                self.__records.clear()
+            else:
+                self.__records.pop(src_id, None)
+
+    @property
+    def stats(self) -> dict:
+        result = {"hits": self.hits, "misses": self.misses, "size": len(self)}
+        if self.store is not None:
+            result["store"] = self.store.stats
+        return result
+
+
+class MergeKeyIndex:
+    """Groups of the sources of a scan that are merged as one, per merge key.
+
+    A key is one field or several joined by "+", e.g. "Reel Name + Start TC".
+    "Source File" is the media pool item itself, fields the snapshot doesn't
+    keep are looked up on the pool items once and remembered. Sources are
+    only grouped with others of the same frame rate and never by an empty
+    value, their frames wouldn't line up.
+    """
+
+    default_key = "Source File"
+    record_fields = {
+        "Source File": "id",
+        "Clip Name": "name",
+        "FPS": "fps",
+        "Start TC": "start_tc",
+        "End TC": "end_tc",
+        "File Name": "file_name",
+        "Reel Name": "reel_name",
+        "File Path": "file_path",
+    }
+
+    def __init__(self, snapshot: "ProjectSnapshot") -> None:
+        self.snapshot = snapshot
+        self.__lock = threading.Lock()
+        # field -> source id -> value, of fields not in SourceRecord
+        self.__values: dict[str, dict[str, str]] = {}
+        # key fields -> source id -> group
+        self.__groups: dict[tuple[str, ...], dict[str, tuple]] = {}
+        # source id -> source id of the first import of the same media
+        self.__canonical: dict[str, str] = None
+
+    @classmethod
+    def parse(cls, key) -> tuple[str, ...]:
+        if isinstance(key, str):
+            key = key.split("+")
+        fields = tuple(i.strip() for i in key or () if i.strip())
+        return fields or (cls.default_key,)
+
+    def values(self, field: str) -> dict[str, str]:
+        """Value of `field` per source id."""
+        sources = self.snapshot.sources
+        attr = self.record_fields.get(field)
+        if attr is not None:
+            return {src_id: getattr(s, attr) for src_id, s in sources.items()}
+
+        values = self.__values.setdefault(field, {})
+        for src_id in sources.keys() - values.keys():
+            values[src_id] = self.__fetch(src_id, field)
+        return values
+
+    def __fetch(self, src_id: str, field: str) -> str:
+        pool_item = self.snapshot.pool_item(src_id)
+        if pool_item is None:
+            # offline snapshots don't have any
+            return ""
+        return pool_item.GetClipProperty(field) or pool_item.GetMetadata(field) or ""
+
+    def groups(self, key=None) -> dict[str, tuple]:
+        """Group per source id, sources with the same group are merged."""
+        fields = self.parse(key)
+        with self.__lock:
+            groups = self.__groups.get(fields)
+            if groups is not None and len(groups) == len(self.snapshot.sources):
+                return groups
+
+            columns = [self.values(field) for field in fields]
+            groups = {}
+            for src_id, source in self.snapshot.sources.items():
+                values = tuple(str(c[src_id]) for c in columns)
+                if fields == (self.default_key,) or not all(values):
+                    groups[src_id] = (src_id,)
+                else:
+                    groups[src_id] = (*values, source.fps, source.drop_frame)
+            self.__groups[fields] = groups
+            return groups
+
+    def canonical(self) -> dict[str, str]:
+        """Per source id the first source of the same media file.
+
+        Media pool items with the same File Path, Start TC and frame rate are
+        the same file imported more than once.
+        """
+        with self.__lock:
+            if self.__canonical is not None and len(self.__canonical) == len(
+                self.snapshot.sources
+            ):
+                return self.__canonical
+
+            firsts = {}
+            canonical = {}
+            for src_id, source in self.snapshot.sources.items():
+                if not source.file_path:
+                    canonical[src_id] = src_id
+                    continue
+                media = (source.file_path, source.start_tc, source.fps)
+                canonical[src_id] = firsts.setdefault(media, src_id)
+            self.__canonical = canonical
+            return canonical
+
+    def invalidate(self):
+        with self.__lock:
+            self.__values.clear()
+            self.__groups.clear()
+            self.__canonical = None
+
+
+class ProjectSnapshot:
+    """Everything the merge needs, read from Resolve exactly once."""
+
+    def __init__(self, name: str, source_cache: SourceCache = None) -> None:
+        self.name = name
+        if source_cache is None:
+            source_cache = SourceCache()
+        self.source_cache = source_cache
+        self.timelines: list[TimelineRecord] = []
+        self.sources: dict[str, SourceRecord] = {}
+        # live MediaPoolItems, only needed to build the merged timeline
+        self.pool_items: dict = {}
+        # a live timeline item per source of timelines reused from a ScanCache,
+        # their MediaPoolItems are only looked up if a merged clip needs them
+        self.source_items: dict = {}
+        self.__key_index: MergeKeyIndex = None
+
+    snapshot_version = 2
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.snapshot_version,
+            "project": self.name,
+            "source_fields": SourceRecord._fields,
+            "clip_fields": ClipRecord._fields,
+            "sources": [list(s) for s in self.sources.values()],
+            "timelines": [
+                dict(tl._asdict(), clips=[list(c) for c in tl.clips])
+                for tl in self.timelines
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProjectSnapshot":
+        if data.get("version") != cls.snapshot_version:
+            raise ValueError("Unsupported snapshot version.", data.get("version"))
+        if tuple(data["source_fields"]) != SourceRecord._fields or tuple(
+            data["clip_fields"]
+        ) != ClipRecord._fields:
+            raise ValueError("Snapshot record layout mismatch.")
+
+        result = cls(data["project"])
+        for row in data["sources"]:
+            source = SourceRecord(*row)
+            result.sources[source.id] = source
+        for tl in data["timelines"]:
+            tl["tracks"] = tuple(tl["tracks"])
+            tl["clips"] = tuple(ClipRecord(*c) for c in tl["clips"])
+            result.timelines.append(TimelineRecord(**tl))
+        return result
+
+    def dump(self, path):
+        """Writes the snapshot as json, gzipped if `path` ends with .gz"""
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path) -> "ProjectSnapshot":
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def head_ins(self) -> dict[str, int]:
+        """Start TC of every source in frames, one batch conversion per fps."""
+        by_fps = {}
+        for source in self.sources.values():
+            by_fps.setdefault(source.tc, []).append(source)
+
+        result = {}
+        for tc, sources in by_fps.items():
+            frames = tc.get_frames_batch([s.start_tc for s in sources])
+            result.update(zip((s.id for s in sources), frames))
+        return result
+
+    @property
+    def key_index(self) -> MergeKeyIndex:
+        """Merge key groups of the sources, shared with subsets."""
+        if self.__key_index is None:
+            self.__key_index = MergeKeyIndex(self)
+        return self.__key_index
+
+    def update(self, other: "ProjectSnapshot"):
+        """Appends the timelines of `other`, keeps sources we already have."""
+        self.timelines.extend(other.timelines)
+        for src_id, source in other.sources.items():
+            self.sources.setdefault(src_id, source)
+        for src_id, pool_item in other.pool_items.items():
+            self.pool_items.setdefault(src_id, pool_item)
+        for src_id, item in other.source_items.items():
+            self.source_items.setdefault(src_id, item)
+
+    def add_cached(self, record: TimelineRecord, sources: dict, items: dict):
+        """Adds a timeline reused from a ScanCache.
+
+        `items` are the live timeline items of that timeline by unique id.
+        """
+        self.timelines.append(record)
+        for clip in record.clips:
+            self.sources.setdefault(clip.source_id, sources[clip.source_id])
+            if clip.id in items:
+                self.source_items.setdefault(clip.source_id, items[clip.id])
+
+    def subset(self, names) -> "ProjectSnapshot":
+        """Snapshot of the timelines called `names`, sharing sources and items."""
+        result = ProjectSnapshot(self.name, self.source_cache)
+        result.timelines = [tl for tl in self.timelines if tl.name in names]
+        result.sources = self.sources
+        result.pool_items = self.pool_items
+        result.source_items = self.source_items
+        result.__key_index = self.key_index
+        return result
+
+    def pool_item(self, src_id: str):
+        pool_item = self.pool_items.get(src_id)
+        if pool_item is None and src_id in self.source_items:
+            pool_item = self.source_items[src_id].GetMediaPoolItem()
+            self.pool_items[src_id] = pool_item
+        return pool_item
+
+    def add_source(self, source: "DVR_SourceClip") -> str:
+        return self.add_sources([source])[0]
+
+    def add_sources(self, sources: list["DVR_SourceClip"]) -> list[str]:
+        """Adds the sources we don't have yet in one lookup, returns their ids."""
+        src_ids = [source.id for source in sources]
+        new = {
+            src_id: source
+            for src_id, source in zip(src_ids, sources)
+            if src_id not in self.sources
+        }
+        if new:
+            records = self.source_cache.get_many(new)
+            # in order of first use, same as adding them one by one
+            for src_id, source in new.items():
+                self.sources[src_id] = records[src_id]
+                self.pool_items[src_id] = source._super
+        return src_ids
+
+
+class ScanCache:
+    """Timeline snapshots of earlier runs and the fingerprints they were read at.
+
+    Persisted per project, timelines whose fingerprint didn't change since
+    the last run are taken from here instead of being read again.
+    """
+
+    cache_version = 2
+
+    def __init__(self, path, project_name: str = "") -> None:
+        self.path = Path(path)
+        self.project_name = project_name
+        self.__lock = threading.Lock()
+        # timeline name -> (fingerprint, TimelineRecord)
+        self.__entries: dict[str, tuple[str, TimelineRecord]] = {}
+        self.__sources: dict[str, SourceRecord] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_project(cls, project_name: str, directory) -> "ScanCache":
+        file_name = re.sub(r"[^\w.-]+", "_", project_name) or "untitled"
+        result = cls(Path(directory) / f"{file_name}.scan.json.gz", project_name)
+        result.load()
+        return result
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.cache_version:
+                return
+            snapshot = ProjectSnapshot.from_dict(data["snapshot"])
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            log.warning("ignoring scan cache %s: %s", self.path, err)
+            return
+
+        with self.__lock:
+            self.__sources = snapshot.sources
+            self.__entries = {
+                tl.name: (fingerprint, tl)
+                for fingerprint, tl in zip(data["fingerprints"], snapshot.timelines)
+            }
+
+    def save(self):
+        snapshot = ProjectSnapshot(self.project_name)
+        with self.__lock:
+            fingerprints = []
+            for fingerprint, tl in self.__entries.values():
+                fingerprints.append(fingerprint)
+                snapshot.timelines.append(tl)
+                for clip in tl.clips:
+                    snapshot.sources[clip.source_id] = self.__sources[clip.source_id]
+
+        data = {
+            "version": self.cache_version,
+            "fingerprints": fingerprints,
+            "snapshot": snapshot.to_dict(),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        tmp_path.replace(self.path)
+
+    def get(self, name: str, fingerprint: str):
+        """(TimelineRecord, its sources) if `fingerprint` is still current."""
+        with self.__lock:
+            entry = self.__entries.get(name)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            self.hits += 1
+            record = entry[1]
+            sources = {c.source_id: self.__sources[c.source_id] for c in record.clips}
+            return record, sources
+
+    def put(self, fingerprint: str, record: TimelineRecord, sources: dict):
+        with self.__lock:
+            self.__entries[record.name] = (fingerprint, record)
+            for clip in record.clips:
+                self.__sources[clip.source_id] = sources[clip.source_id]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__sources.clear()
+        self.path.unlink(missing_ok=True)
+
+    @property
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.__entries)}
+
+
+class MergeCancelled(Exception):
+    """Raised inside a merge whose progress got cancelled."""
+
+
+class Progress:
+    """Progress of a running merge, read and cancelled from other threads."""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__cancelled = threading.Event()
+        self.stage = ""
+        self.done = 0
+        self.total = 0
+        self.__started = time.perf_counter()
+
+    def start(self, stage: str, total: int):
+        self.check()
+        with self.__lock:
+            self.stage = stage
+            self.done = 0
+            self.total = total
+            self.__started = time.perf_counter()
+
+    def advance(self, n: int = 1):
+        self.check()
+        with self.__lock:
+            self.done += n
+
+    def cancel(self):
+        self.__cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled.is_set()
+
+    def check(self):
+        if self.__cancelled.is_set():
+            raise MergeCancelled(self.stage)
+
+    @property
+    def eta(self) -> float:
+        """Seconds left in the current stage, None until there's a rate."""
+        with self.__lock:
+            done, total = self.done, self.total
+            elapsed = time.perf_counter() - self.__started
+        if not done or not total:
+            return None
+        return elapsed / done * (total - done)
+
+    def __str__(self) -> str:
+        if not self.stage:
+            return ""
+        res = f"{self.stage} {self.done}/{self.total}"
+        eta = self.eta
+        if eta is not None:
+            res += f", ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        return res
+
+
+class ApiStats:
+    """Calls and seconds spent per scripting API method, shared by all proxies."""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.calls = Counter()
+        self.seconds = defaultdict(float)
+
+    def record(self, name: str, seconds: float):
+        with self.__lock:
+            self.calls[name] += 1
+            self.seconds[name] += seconds
+
+    def reset(self):
+        with self.__lock:
+            self.calls.clear()
+            self.seconds.clear()
+
+    def table(self, top: int = 15) -> str:
+        with self.__lock:
+            rows = sorted(self.seconds.items(), key=lambda i: i[1], reverse=True)
+            calls = dict(self.calls)
+
+        lines = [f"{'method':<28}{'calls':>10}{'total s':>12}{'mean ms':>12}"]
+        for name, seconds in rows[:top]:
+            mean = seconds / calls[name] * 1000
+            lines.append(f"{name:<28}{calls[name]:>10}{seconds:>12.3f}{mean:>12.3f}")
+        total = sum(calls.values())
+        lines.append(f"{'total':<28}{total:>10}{sum(s for _, s in rows):>12.3f}")
+        return "\n".join(lines)
+
+
+class ApiProxy:
+    """Times every method call of a wrapped scripting API object.
+
+    Objects returned by those calls are wrapped as well, also inside lists
+    and dicts, and proxies passed as arguments are unwrapped again.
+    """
+
+    __slots__ = ("_obj", "_stats")
+
+    def __init__(self, obj, stats: ApiStats) -> None:
+        self._obj = obj
+        self._stats = stats
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            args = _unwrap_api(args)
+            kwargs = _unwrap_api(kwargs)
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            finally:
+                self._stats.record(name, time.perf_counter() - start)
+            return _wrap_api(result, self._stats)
+
+        return call
+
+    def __eq__(self, other) -> bool:
+        return self._obj == _unwrap_api(other)
+
+    def __hash__(self) -> int:
+        return hash(self._obj)
+
+    def __bool__(self) -> bool:
+        return bool(self._obj)
+
+    def __repr__(self) -> str:
+        return f"ApiProxy({self._obj!r})"
+
+
+def _wrap_api(value, stats: ApiStats):
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return type(value)(_wrap_api(i, stats) for i in value)
+    if isinstance(value, dict):
+        return {k: _wrap_api(v, stats) for k, v in value.items()}
+    return ApiProxy(value, stats)
+
+
+def _unwrap_api(value):
+    if isinstance(value, ApiProxy):
+        return value._obj
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap_api(i) for i in value)
+    if isinstance(value, dict):
+        return {k: _unwrap_api(v) for k, v in value.items()}
+    return value
+
+
+# DVR_API_STATS=1 times all scripting API calls and logs the slowest methods
+# after every merge, DVR_API_STATS_TOP sets how many
+api_stats = ApiStats() if os.environ.get("DVR_API_STATS", "0") != "0" else None
+api_stats_top = int(os.environ.get("DVR_API_STATS_TOP", 15))
 
 
 class DVR_ProjectManager:
     def __init__(self) -> None:
-        self.__manager = bmd.scriptapp("Resolve").GetProjectManager()
+        resolve = bmd.scriptapp("Resolve")
+        if api_stats is not None:
+            resolve = ApiProxy(resolve, api_stats)
+        self.__manager = resolve.GetProjectManager()
         self.__current_project = self.manager.GetCurrentProject()
         self.__mediapool = self.current_project.GetMediaPool()
 
@@ -209,13 +1052,59 @@ class DVR_ProjectManager:
         result = []
         for i in range(1, self.current_project.GetTimelineCount() + 1):
             dvrtl = self.current_project.GetTimelineByIndex(i)
-            tl = DVR_Timeline(dvrtl)
             result.append(DVR_Timeline(dvrtl))
 
         return result
 
+    def snapshot(
+        self,
+        timelines,
+        source_cache: SourceCache = None,
+        workers: int = 1,
+        scan_cache: ScanCache = None,
+        progress: Progress = None,
+    ) -> ProjectSnapshot:
+        result = ProjectSnapshot(self.current_project_name, source_cache)
+        if progress is None:
+            progress = Progress()
+
+        def snapshot_timeline(tl):
+            # lets queued timelines bail out quickly after a cancel
+            progress.check()
+            part = ProjectSnapshot(result.name, result.source_cache)
+            if scan_cache is None:
+                part.timelines.append(tl.snapshot(part))
+                return part
+
+            fingerprint, items = tl.fingerprint()
+            cached = scan_cache.get(tl.name, fingerprint)
+            if cached:
+                part.add_cached(*cached, items)
+            else:
+                record = tl.snapshot(part)
+                part.timelines.append(record)
+                scan_cache.put(fingerprint, record, part.sources)
+            return part
+
+        if workers <= 1:
+            # some Resolve builds don't like API calls from several threads
+            for tl in timelines:
+                result.update(snapshot_timeline(tl))
+                progress.advance()
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() keeps the timeline order, same snapshot as a serial scan
+            for part in pool.map(snapshot_timeline, timelines):
+                result.update(part)
+                progress.advance()
+        return result
+
 
 class DVR_SourceClip:
+    # the only clip properties the merge needs
+    snapshot_keys = ("Start TC", "End TC", "FPS", "File Name", "Reel Name", "File Path")
+
     def __init__(self, dvr_obj) -> None:
         self.__dvr_obj = dvr_obj
 
@@ -239,11 +1128,28 @@ class DVR_SourceClip:
         result.update(self.__dvr_obj.GetClipProperty())
         return dict(sorted(result.items()))
 
+    def get_property(self, key: str):
+        return self.__dvr_obj.GetClipProperty(key)
+
     @property
     # TODO: break out the wrapper classes and inherit
     def _super(self):
         return self.__dvr_obj
 
+    def snapshot(self, src_id: str = None) -> SourceRecord:
+        # single key lookups, the full property dict is way more expensive
+        props = {k: self.get_property(k) for k in self.snapshot_keys}
+        return SourceRecord(
+            id=src_id or self.id,
+            name=self.name,
+            fps=float(props["FPS"]),
+            start_tc=props["Start TC"],
+            end_tc=props["End TC"],
+            file_name=props["File Name"],
+            reel_name=props["Reel Name"],
+            file_path=props["File Path"],
+        )
+
 
 class DVR_Clip:
     def __init__(self, dvr_obj) -> None:
@@ -286,18 +1192,20 @@ class DVR_Clip:
 
     @property
     def head_in(self) -> int:
-        TC.set_fps(float(self.source.properties.get("FPS")))
-        res = TC.get_frames(str(self.source.properties.get("Start TC")))
-        log.debug(f"HEAD IN {TC.get_tc(res) = }")
-        log.debug(f"HEAD IN {res = }")
+        source = self.source
+        start_tc = str(source.get_property("Start TC"))
+        tc = TC.get(float(source.get_property("FPS")), ";" in start_tc)
+        res = tc.get_frames(start_tc)
+        log.debug("HEAD IN %s (%d)", start_tc, res)
         return res
 
     @property
     def tail_out(self) -> int:
-        TC.set_fps(float(self.source.properties.get("FPS")))
-        res = TC.get_frames(str(self.source.properties.get("End TC")))
-        log.debug(f"TAIL_OUT {TC.get_tc(res) = }")
-        log.debug(f"TAIL_OUT {res = }")
+        source = self.source
+        end_tc = str(source.get_property("End TC"))
+        tc = TC.get(float(source.get_property("FPS")), ";" in end_tc)
+        res = tc.get_frames(end_tc)
+        log.debug("TAIL_OUT %s (%d)", end_tc, res)
         return res
 
     @property
@@ -311,19 +1219,16 @@ class DVR_Clip:
 
     @property
     def src_in(self) -> int:
-        res = self.head_in + self.left_offset
-        log.debug(f"SRC_IN {res = }")
-        log.debug(f"SRC_IN {TC.get_tc(res) = }")
-        log.debug(f"LEFT OFFSET {self.left_offset = }")
+        left_offset = self.left_offset
+        res = self.head_in + left_offset
+        log.debug("SRC_IN %d, LEFT OFFSET %d", res, left_offset)
         return res
 
     @property
     def src_out(self) -> int:
         # ? why doesn't this here work: self.tail_out - self.right_offset
         res = self.src_in + self.duration
-        log.debug(f"SRC_OUT {res = }")
-        log.debug(f"SRC_OUT {TC.get_tc(res) = }")
-        log.debug(f"RIGHT OFFSET {self.right_offset = }")
+        log.debug("SRC_OUT %d", res)
         return res
 
     @property
@@ -331,11 +1236,13 @@ class DVR_Clip:
         # TODO: support timeremaps
         #! somehow gotta calc the duration based on source in/out that are timeremapped TO and not FROM
         # res = int(self.__dvr_obj.GetDuration())
-        res = self.right_offset - self.left_offset
-        log.debug(f"")
-        log.debug(f"DURATION {res = }")
-        log.debug(f"{self.properties = }")
-        log.debug(f"{self.__dvr_obj.GetProperty('_Stabilization') = }")
+        right_offset = self.right_offset
+        res = right_offset - self.left_offset
+        log.debug("DURATION %d, RIGHT OFFSET %d", res, right_offset)
+        # more API calls, only worth it when someone reads them
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("properties = %s", _Summary(self.properties))
+            log.debug("_Stabilization = %s", self.__dvr_obj.GetProperty("_Stabilization"))
         return res
 
     @property
@@ -346,12 +1253,26 @@ class DVR_Clip:
     def properties(self):
         return dict(self.__dvr_obj.GetProperty())
 
+    def snapshot(self, track: str, source_id: str) -> ClipRecord:
+        return ClipRecord(
+            id=self.id,
+            name=self.name,
+            track=track,
+            edit_in=self.edit_in,
+            edit_out=self.edit_out,
+            left_offset=self.left_offset,
+            right_offset=self.right_offset,
+            color=self.color,
+            source_id=source_id,
+        )
 
-class DVR_Timeline:
-    __track_filter: list[str]
 
-    def __init__(self, dvr_obj) -> None:
+class DVR_Timeline:
+    def __init__(self, dvr_obj, track_filter: list[str] = None) -> None:
         self.__dvr_obj = dvr_obj
+        self.__track_filter = list(track_filter or [])
+        # (track index, name) per video track, resolved once per timeline
+        self.__track_index: tuple[tuple[int, str], ...] = None
 
     def __str__(self) -> str:
         return self.name
@@ -380,21 +1301,37 @@ class DVR_Timeline:
     def framerate(self) -> float:
         return float(self.__dvr_obj.GetSetting("timelineFrameRate"))
 
-    @classmethod
-    def set_track_filter(cls, para):
-        cls.__track_filter = para
+    @property
+    def track_filter(self) -> list[str]:
+        return self.__track_filter
+
+    @track_filter.setter
+    def track_filter(self, para):
+        self.__track_filter = list(para or [])
 
     @property
     def is_drop_frame(self):
+        # "0" or "1", bool("0") would be True
         result = self.__dvr_obj.GetSetting("timelineDropFrameTimecode")
-        return bool(result)
+        return bool(int(result or 0))
+
+    @property
+    def track_index(self) -> tuple[tuple[int, str], ...]:
+        if self.__track_index is None:
+            count = self.__dvr_obj.GetTrackCount("video")
+            self.__track_index = tuple(
+                (i, str(self.__dvr_obj.GetTrackName("video", i)))
+                for i in range(1, count + 1)
+            )
+        return self.__track_index
+
+    def refresh_tracks(self):
+        """Forgets the track index, e.g. after tracks were added or renamed."""
+        self.__track_index = None
 
     @property
     def video_tracks(self) -> list[str]:
-        result = []
-        for i in range(0, self.__dvr_obj.GetTrackCount("video")):
-            result.append(self.__dvr_obj.GetTrackName("video", i + 1))
-        return result
+        return [name for _, name in self.track_index]
 
     @property
     def markers(self):
@@ -403,26 +1340,468 @@ class DVR_Timeline:
     @property
     def clips(self) -> list[DVR_Clip]:
         result = []
-        log.debug(f"{self.video_tracks = }")
-        for i in range(len(self.video_tracks)):
-            if self.video_tracks[i] in self.__track_filter:
+        log.debug("track_index = %s", self.track_index)
+        for i, track in self.track_index:
+            if track in self.__track_filter:
                 continue
-            for c in self.__dvr_obj.GetItemListInTrack("video", i + 1):
+            for c in self.__dvr_obj.GetItemListInTrack("video", i):
                 clip = DVR_Clip(c)
                 clip.used_in_timeline = self
                 result.append(clip)
         return result
 
+    def fingerprint(self) -> tuple[str, dict]:
+        """Hash of what a snapshot of this timeline depends on.
+
+        Much cheaper than a snapshot, only ids, offsets and colors of the
+        items and the ids of their media pool items are read. Returns the
+        hash and the timeline items by unique id.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        timeline = (
+            self.name,
+            self.framerate,
+            self.is_drop_frame,
+            self.start_frame,
+            self.end_frame,
+            self.track_index,
+        )
+        digest.update(repr(timeline).encode())
+
+        items = {}
+        for i, _ in self.track_index:
+            track_items = self.__dvr_obj.GetItemListInTrack("video", i)
+            digest.update(f"{i}:{len(track_items)}".encode())
+            for c in track_items:
+                clip = DVR_Clip(c)
+                item_id = clip.id
+                items[item_id] = c
+                # Replace Clip keeps the item and its offsets, not its source
+                mpi = c.GetMediaPoolItem()
+                source_id = mpi.GetUniqueId() if mpi else None
+                item = (
+                    item_id,
+                    source_id,
+                    clip.left_offset,
+                    clip.right_offset,
+                    clip.color,
+                )
+                digest.update(repr(item).encode())
+        return digest.hexdigest(), items
+
+    def snapshot(self, project: ProjectSnapshot) -> TimelineRecord:
+        # all tracks are read, track filters are applied by the Merger
+        items, sources = [], []
+        for i, track in self.track_index:
+            for c in self.__dvr_obj.GetItemListInTrack("video", i):
+                mpi = c.GetMediaPoolItem()
+                if not mpi:
+                    # generators, titles, compound clips...
+                    continue
+                items.append((DVR_Clip(c), track))
+                sources.append(DVR_SourceClip(mpi))
+        # sources of the whole timeline are looked up in one go
+        src_ids = project.add_sources(sources)
+        clips = [
+            clip.snapshot(track, src_id)
+            for (clip, track), src_id in zip(items, src_ids)
+        ]
+        return TimelineRecord(
+            name=self.name,
+            framerate=self.framerate,
+            drop_frame=self.is_drop_frame,
+            start_frame=self.start_frame,
+            end_frame=self.end_frame,
+            tracks=tuple(self.video_tracks),
+            clips=tuple(clips),
+        )
+
+
+class SourceUsage:
+    """Frames of one source used by the clips to merge.
+
+    Kept as sorted, disjoint closed intervals. Overlapping usages are folded
+    in as they arrive, so memory grows with the separate pieces of a source
+    that are in use, not with the number of clips using them.
+    """
+
+    __slots__ = ("starts", "ends", "count")
+
+    def __init__(self) -> None:
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        # usages added, including zero length ones
+        self.count = 0
+
+    def __repr__(self) -> str:
+        return f"SourceUsage({self.count} usages, {self.intervals})"
+
+    def add(self, src_in: int, src_out: int):
+        """Adds the frames of a clip, `src_out` is exclusive."""
+        self.count += 1
+        if src_in != src_out:
+            self.add_interval(min(src_in, src_out), max(src_in, src_out) - 1)
+
+    def add_interval(self, start: int, end: int):
+        starts, ends = self.starts, self.ends
+        # intervals i..j-1 overlap [start, end], adjacent ones stay apart so
+        # a merge gap of 0 still splits them
+        i = bisect_left(ends, start)
+        j = bisect_right(starts, end)
+        if i < j:
+            start = min(start, starts[i])
+            end = max(end, ends[j - 1])
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+
+    def update(self, other: "SourceUsage"):
+        self.count += other.count
+        for start, end in other.intervals:
+            self.add_interval(start, end)
+
+    @property
+    def intervals(self) -> list[tuple[int, int]]:
+        return list(zip(self.starts, self.ends))
+
+
+class OccurrenceStore:
+    """Usages of all sources as int64 columns, for very large projects.
+
+    One row per piece of a source in use: the source as an index into
+    `source_ids` and the closed [start, end] frames. A usage overlapping the
+    last row of its source is folded into it as it arrives, and whenever the
+    rows double, overlapping rows of each source are merged in bulk (sorted
+    with numpy when it's installed). Like SourceUsage, memory grows with the
+    separate pieces of the sources, not with the number of clips.
+    """
+
+    # rows before the first compaction
+    compact_min = 1 << 16
+
+    def __init__(self) -> None:
+        self.source_ids: list[str] = []
+        self.__index: dict[str, int] = {}
+        # row of the last piece added per source index
+        self.__last: dict[int, int] = {}
+        self.__compact_at = self.compact_min
+        self.sources = array("q")
+        self.starts = array("q")
+        self.ends = array("q")
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def __repr__(self) -> str:
+        return f"OccurrenceStore({len(self)} pieces of {len(self.source_ids)} sources)"
+
+    def intern(self, src_id: str) -> int:
+        index = self.__index.get(src_id)
+        if index is None:
+            index = self.__index[src_id] = len(self.source_ids)
+            self.source_ids.append(src_id)
+        return index
+
+    def add(self, src_id: str, src_in: int, src_out: int):
+        """Adds the frames of a clip, `src_out` is exclusive."""
+        index = self.intern(src_id)
+        if src_in == src_out:
+            return
+        start, end = min(src_in, src_out), max(src_in, src_out) - 1
+        row = self.__last.get(index)
+        if row is not None and start <= self.ends[row] and end >= self.starts[row]:
+            self.starts[row] = min(start, self.starts[row])
+            self.ends[row] = max(end, self.ends[row])
+            return
+        self.__last[index] = len(self.sources)
+        self.sources.append(index)
+        self.starts.append(start)
+        self.ends.append(end)
+        if len(self) >= self.__compact_at:
+            self.compact()
+
+    def extend(self, usages):
+        """Adds (source id, src in, src out) records."""
+        for src_id, src_in, src_out in usages:
+            self.add(src_id, src_in, src_out)
+
+    def update(self, other: "OccurrenceStore"):
+        """Appends the rows of `other`, its sources mapped onto ours."""
+        mapping = [self.intern(src_id) for src_id in other.source_ids]
+        self.sources.extend(mapping[i] for i in other.sources)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        if len(self) >= self.__compact_at:
+            self.compact()
+
+    def compact(self):
+        """Merges the overlapping rows of each source."""
+        rows = list(self.__merged())
+        self.sources = array("q", [row[0] for row in rows])
+        self.starts = array("q", [row[1] for row in rows])
+        self.ends = array("q", [row[2] for row in rows])
+        # rows are sorted by source, the last one of each wins
+        self.__last = {index: row for row, index in enumerate(self.sources)}
+        self.__compact_at = max(2 * len(self), self.compact_min)
+
+    def intervals(self):
+        """(source id, intervals) per source in order of first use.
+
+        Intervals are the disjoint closed [start, end] frames of its usages
+        sorted by start, adjacent ones kept apart as in SourceUsage.
+        """
+        # rows are sorted by source index, cut them where it changes
+        group, intervals = None, []
+        for index, start, end in self.__merged():
+            if index != group:
+                if intervals:
+                    yield self.source_ids[group], intervals
+                group, intervals = index, []
+            intervals.append((start, end))
+        if intervals:
+            yield self.source_ids[group], intervals
+
+    def __merged(self):
+        """Rows sorted by source and start, overlapping ones merged."""
+        if np is not None:
+            rows = self.__rows_np()
+        else:
+            rows = sorted(zip(self.sources, self.starts, self.ends))
+
+        group = start = end = None
+        for index, row_start, row_end in rows:
+            if index == group and row_start <= end:
+                end = max(end, row_end)
+                continue
+            if group is not None:
+                yield group, start, end
+            group, start, end = index, row_start, row_end
+        if group is not None:
+            yield group, start, end
+
+    def __rows_np(self):
+        if not len(self):
+            return []
+        sources = np.frombuffer(self.sources, dtype=np.int64)
+        starts = np.frombuffer(self.starts, dtype=np.int64)
+        ends = np.frombuffer(self.ends, dtype=np.int64)
+
+        order = np.lexsort((ends, starts, sources))
+        sources, starts, ends = sources[order], starts[order], ends[order]
+        # sorted, so duplicates are next to each other
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (
+            (np.diff(sources) != 0) | (np.diff(starts) != 0) | (np.diff(ends) != 0)
+        )
+        return zip(sources[keep].tolist(), starts[keep].tolist(), ends[keep].tolist())
+
+
+def iter_usages(timelines, head_ins, color_to_skip, tracks_to_skip, progress=None):
+    """(source id, src in, src out) of every clip to merge, src out is exclusive."""
+    for tl in timelines:
+        if progress is not None:
+            progress.advance(len(tl.clips))
+        log.debug("analyzing timeline: %s (%d clips)", tl.name, len(tl.clips))
+        for tl_clip in tl.clips:
+            if tl_clip.color == color_to_skip:
+                continue
+            if tl_clip.track in tracks_to_skip:
+                continue
+            src_id = tl_clip.source_id
+            src_in, src_out = tl_clip.usage(head_ins[src_id])
+            yield src_id, src_in, src_out
+
+
+def collect_usages(
+    timelines, head_ins, color_to_skip, tracks_to_skip, progress: Progress = None
+) -> dict[str, SourceUsage]:
+    """SourceUsage per source id, for the clips to merge."""
+    occs = {}  # usages per mediapoolitem
+    usages = iter_usages(timelines, head_ins, color_to_skip, tracks_to_skip, progress)
+    for src_id, src_in, src_out in usages:
+        usage = occs.get(src_id)
+        if usage is None:
+            usage = occs[src_id] = SourceUsage()
+        usage.add(src_in, src_out)
+
+    return occs
+
+
+def collect_occurrences(
+    timelines, head_ins, color_to_skip, tracks_to_skip, progress: Progress = None
+) -> OccurrenceStore:
+    """OccurrenceStore of the clips to merge."""
+    store = OccurrenceStore()
+    store.extend(
+        iter_usages(timelines, head_ins, color_to_skip, tracks_to_skip, progress)
+    )
+    return store
+
+
+class MergeJob(threading.Thread):
+    """Scans and computes a merge off the UI thread.
+
+    The merged timeline is left to the caller, see `Merger.finish_merge`.
+    """
+
+    label = "Merge"
+
+    def __init__(self, merger: "Merger") -> None:
+        super().__init__(name=self.label.lower(), daemon=True)
+        self.merger = merger
+        self.progress = Progress()
+        self.result: tuple = None
+        self.error: Exception = None
+
+    def run(self):
+        self.merger.progress = self.progress
+        try:
+            self.result = self.work()
+        except Exception as err:
+            self.error = err
+        finally:
+            self.merger.progress = Progress()
+
+    def work(self):
+        return self.merger.prepare_merge()
+
+
+class ScanJob(MergeJob):
+    """Scans the project off the UI thread, for Rescan and Clear Cache."""
+
+    label = "Scan"
+
+    def work(self):
+        return self.merger.scan()
+
+
+class RunReport:
+    """Wall time and traced memory peak per phase of one merge.
+
+    Appended as a json line to `~/logs/dvr.report.jsonl`. DVR_TRACE_MEMORY=1
+    adds traced memory peaks, DVR_PROFILE=1 writes a cProfile dump of the
+    merge thread next to it. Both slow the merge down and are off by default.
+    """
+
+    report_version = 1
+    path: Path = Path.home() / "logs" / "dvr.report.jsonl"
+    trace_memory: bool = os.environ.get("DVR_TRACE_MEMORY", "0") != "0"
+    profile: bool = os.environ.get("DVR_PROFILE", "0") != "0"
+
+    def __init__(self) -> None:
+        self.started = datetime.now().isoformat(timespec="milliseconds")
+        self.phases: list[dict] = []
+        self.info: dict = {}
+        self.seconds: float = 0.0
+        self.profile_path: Path = None
+        self.__profiler = cProfile.Profile() if self.profile else None
+
+    @contextmanager
+    def capture(self):
+        """Runs part of the merge, with tracemalloc and cProfile if enabled.
+
+        Entered once per thread the merge runs on, the times add up.
+        """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.__profiler:
+            self.__profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds += time.perf_counter() - start
+            if self.__profiler:
+                self.__profiler.disable()
+            if tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            entry = {"phase": name, "seconds": round(seconds, 4)}
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - current
+                entry["peak_mb"] = round(max(peak, 0) / pow(1024, 2), 3)
+            self.phases.append(entry)
+            log.info("%s took %.3fs", name, seconds)
+
+    def to_dict(self) -> dict:
+        peaks = [p["peak_mb"] for p in self.phases if "peak_mb" in p]
+        return {
+            "version": self.report_version,
+            "started": self.started,
+            "seconds": round(self.seconds, 4),
+            "peak_mb": max(peaks, default=None),
+            "profile": str(self.profile_path) if self.profile_path else None,
+            **self.info,
+            "phases": self.phases,
+        }
+
+    def write(self, path=None):
+        path = Path(path or self.path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if self.__profiler:
+                stamp = self.started.replace(":", "-")
+                self.profile_path = path.with_name(f"dvr.{stamp}.prof")
+                self.__profiler.dump_stats(self.profile_path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.to_dict()) + "\n")
+        except OSError as err:
+            log.warning("couldn't write run report to %s: %s", path, err)
+        else:
+            log.info("run report appended to %s", path)
+
 
 class Merger:
     def __init__(self, fu) -> None:
         self.fu = fu
-        self.__mode: str
+        self.source_cache = SourceCache()
+        # merge key, see MergeKeyIndex
+        self.__mode: str = MergeKeyIndex.default_key
+        # merge media pool items of the same media file as one source
+        self.__dedupe_media: bool = False
         self.__gapsize: int
         self.__timeline_in: str
         self.__timeline_out: str
         self.__color_to_skip: str
+        self.__tracks_to_skip: list[str] = []
         self.__timeline_filter: re.Pattern
+        # threads reading timelines from Resolve, 1 scans serially
+        self.__scan_workers: int = 1
+        # processes collecting usages from a snapshot, 1 runs in-process
+        self.__compute_workers: int = 1
+        # timeline items from which usages go to an OccurrenceStore instead
+        # of a SourceUsage per source, 0 always uses the store
+        self.__columnar_threshold: int = 100_000
+        # where timeline fingerprints are kept between runs, None disables it
+        self.__scan_cache_dir: Path = Path.home() / ".cache" / "merge_timelines"
+        self.__scan_cache: ScanCache = None
+        # source records shared by all runs and projects, None disables it
+        self.__source_store_path: Path = SourceStore.path
+        self.__source_store: SourceStore = None
+        # last scan and the names of all project timelines at that time,
+        # reused by merges and previews until invalidated
+        self.__scan: tuple[DVR_ProjectManager, ProjectSnapshot] = None
+        self.__scan_time: datetime = None
+        self.__project_timelines: list[str] = []
+        # phases of the merge running right now
+        self.report: RunReport = None
+        # replaced by a MergeJob to follow or cancel the merge
+        self.progress: Progress = Progress()
+        # clip infos per AppendToTimeline call and retries of a failing call
+        self.__append_chunk_size: int = 500
+        self.__append_retries: int = 1
+        self.__appended: int = 0
 
     @property
     def timeline_in(self):
@@ -447,7 +1826,7 @@ class Merger:
     @timeline_filter.setter
     def timeline_filter(self, para):
         res = re.compile(para)
-        log.debug(f"{res = }")
+        log.debug("timeline_filter = %r", res)
         self.__timeline_filter = res
 
     @property
@@ -458,6 +1837,14 @@ class Merger:
     def mode(self, var):
         self.__mode = var
 
+    @property
+    def dedupe_media(self) -> bool:
+        return self.__dedupe_media
+
+    @dedupe_media.setter
+    def dedupe_media(self, var):
+        self.__dedupe_media = bool(var)
+
     @property
     def gapsize(self):
         return self.__gapsize
@@ -474,152 +1861,613 @@ class Merger:
     def color_to_skip(self, var):
         self.__color_to_skip = var
 
-    # ! i don't need sets here, can we just do it with lists?
-    def find_best_ranges(self, sets):
-        # thanks chatGPT
-        sets.sort(key=lambda s: min(s))
+    @property
+    def scan_workers(self) -> int:
+        return self.__scan_workers
+
+    @scan_workers.setter
+    def scan_workers(self, var):
+        self.__scan_workers = max(1, int(var))
+
+    @property
+    def compute_workers(self) -> int:
+        return self.__compute_workers
+
+    @compute_workers.setter
+    def compute_workers(self, var):
+        self.__compute_workers = max(1, int(var))
+
+    @property
+    def columnar_threshold(self) -> int:
+        return self.__columnar_threshold
 
-        best_ranges = []
-        current_range = sets[0].copy()
-        for s in sets[1:]:
+    @columnar_threshold.setter
+    def columnar_threshold(self, var):
+        self.__columnar_threshold = max(0, int(var))
+
+    @property
+    def append_chunk_size(self) -> int:
+        return self.__append_chunk_size
+
+    @append_chunk_size.setter
+    def append_chunk_size(self, var):
+        self.__append_chunk_size = max(1, int(var))
+
+    @property
+    def append_retries(self) -> int:
+        return self.__append_retries
+
+    @append_retries.setter
+    def append_retries(self, var):
+        self.__append_retries = max(0, int(var))
+
+    @property
+    def scan_cache_dir(self) -> Path:
+        return self.__scan_cache_dir
+
+    @scan_cache_dir.setter
+    def scan_cache_dir(self, var):
+        self.__scan_cache_dir = Path(var) if var else None
+        self.__scan_cache = None
+
+    def get_scan_cache(self, project_name: str) -> ScanCache:
+        if self.scan_cache_dir is None:
+            return None
+        if self.__scan_cache is None or self.__scan_cache.project_name != project_name:
+            self.__scan_cache = ScanCache.for_project(project_name, self.scan_cache_dir)
+        return self.__scan_cache
+
+    @property
+    def source_store_path(self) -> Path:
+        return self.__source_store_path
+
+    @source_store_path.setter
+    def source_store_path(self, var):
+        self.__source_store_path = Path(var) if var else None
+        if self.__source_store is not None:
+            self.__source_store.close()
+        self.__source_store = None
+
+    def get_source_store(self) -> SourceStore:
+        if self.source_store_path is None:
+            return None
+        if self.__source_store is None:
+            try:
+                self.__source_store = SourceStore(self.source_store_path)
+            except (OSError, sqlite3.Error) as err:
+                log.warning("no source store at %s: %s", self.source_store_path, err)
+                self.__source_store_path = None
+        return self.__source_store
+
+    @property
+    def tracks_to_skip(self) -> list[str]:
+        return self.__tracks_to_skip
+
+    @tracks_to_skip.setter
+    def tracks_to_skip(self, var):
+        self.__tracks_to_skip = var
+
+    def find_best_ranges(self, ranges):
+        """Coalesces closed (start, end) frame intervals of one source.
+
+        Intervals starting at most `gapsize` frames after the current range
+        ends are merged into it. Gaps bridged that way don't count towards the
+        covered length of a range.
+        """
+        if not ranges:
+            return []
+
+        ranges = sorted(ranges, key=lambda r: r[0])
+
+        best_ranges = []  # (start, end, covered frames)
+        start, end = ranges[0]
+        covered = end - start + 1
+        for s, e in ranges[1:]:
             # compare current in with last out, aka. soft gap between 2 ranges
-            if min(s) - max(current_range) <= self.gapsize:
+            if s - end <= self.gapsize:
                 # clip is in gapsize or inside previous clip...
-                current_range.update(s)
+                # everything before `s` is already counted (or a gap), only
+                # frames past the current end are new.
+                covered += max(0, e - max(s - 1, end))
+                end = max(end, e)
             else:
                 # hard gap right here. add current range to best_ranges and update current
-                best_ranges.append(list(current_range))
-                current_range = s.copy()
-
-        best_ranges.append(list(current_range))
-
-        # Find the best combination of ranges
-        def total_length(ranges):
-            return sum(len(r) for r in ranges)
-
-        best_combination = []
-        best_length = 0
-
-        for i in range(len(best_ranges)):
-            for j in range(i, len(best_ranges)):
-                combined_ranges = best_ranges[i : j + 1]
-                combined_length = total_length(combined_ranges)
-
-                if combined_length > best_length:
-                    best_combination = combined_ranges
-                    best_length = combined_length
-
-        return best_combination
-
-    def get_occurences(self, timelines):
-        occs = {}  # occurrences per mediapoolitem
-        for tl in timelines:
-            TC.set_fps(tl.framerate)
-            log.debug("------------------------------------------------")
-            log.debug(f"analyzing timeline: {tl.name}")
-            log.debug(f"{tl.root_object.GetCurrentVideoItem()}")
-            log.debug(f"{tl.properties}")
-            for tl_clip in tl.clips:
-                log.debug(f"{tl_clip.properties = }")
-                log.debug(f"{tl_clip.color} -- {self.color_to_skip}")
-                if not tl_clip.color == self.color_to_skip:
-                    src_clip = tl_clip.source
-                    # never seen this MPI before... add it
-                    if not src_clip.id in occs.keys():
-                        occs.update(
-                            {
-                                src_clip.id: {
-                                    "source": src_clip,
-                                    "usages": {
-                                        tl_clip.id: {
-                                            "clip": tl_clip,
-                                            "usage": (tl_clip.src_in, tl_clip.src_out),
-                                        }
-                                    },
-                                }
-                            }
-                        )
-                    else:
-                        occs[src_clip.id]["usages"].update(
-                            {
-                                tl_clip.id: {
-                                    "clip": tl_clip,
-                                    "usage": (tl_clip.src_in, tl_clip.src_out),
-                                }
-                            }
-                        )
+                best_ranges.append((start, end, covered))
+                start, end = s, e
+                covered = e - s + 1
+
+        best_ranges.append((start, end, covered))
+
+        # Find the best combination of ranges, i.e. the contiguous run with the
+        # most covered frames. One pass over the running sum, keeping the
+        # smallest prefix seen so far; the earliest run wins on ties.
+        best_i, best_j, best_length = 0, -1, 0
+        prefix, min_prefix, min_i = 0, 0, 0
+        for j, r in enumerate(best_ranges):
+            prefix += r[2]
+            length = prefix - min_prefix
+            if length > best_length or (
+                length == best_length and length > 0 and min_i < best_i
+            ):
+                best_i, best_j, best_length = min_i, j, length
+            if prefix < min_prefix:
+                min_prefix, min_i = prefix, j + 1
+
+        return [(r[0], r[1]) for r in best_ranges[best_i : best_j + 1]]
+
+    def dedupe_sources(self, per_source, canonical: dict[str, str]):
+        """Intervals per source with duplicate imports folded into the first.
+
+        Also returns the intervals of each duplicated media file per import,
+        to tell what merging them saved.
+        """
+        merged, duplicates = {}, {}
+        for src_id, intervals in per_source:
+            first = canonical[src_id]
+            merged.setdefault(first, []).extend(intervals)
+            duplicates.setdefault(first, []).append(intervals)
+        duplicates = {k: v for k, v in duplicates.items() if len(v) > 1}
+        return merged.items(), duplicates
+
+    def log_dedupe(self, duplicates: dict[str, list]):
+        """Logs and reports the frames saved by merging duplicate imports."""
+
+        def frames(intervals):
+            return sum(e - s + 1 for s, e in self.find_best_ranges(intervals))
+
+        saved = 0
+        for imports in duplicates.values():
+            separate = sum(frames(intervals) for intervals in imports)
+            saved += separate - frames([i for intervals in imports for i in intervals])
+        imports = sum(len(v) for v in duplicates.values())
+        log.info(
+            "%d media files imported %d times, deduping saved %d frames",
+            len(duplicates),
+            imports,
+            saved,
+        )
+        if self.report is not None:
+            self.report.info.update(
+                duplicate_media=len(duplicates),
+                duplicate_imports=imports,
+                dedupe_saved_frames=saved,
+            )
+
+    def split_range(self, snapshot, members, head_ins, start, end) -> list[tuple]:
+        """(source id, start, end) pieces of a group's range [start, end].
+
+        Every piece lies within the media of its source, from its head in up
+        to its End TC, unbounded if it has none. Where several members cover
+        a frame, the one reaching furthest wins, the first one used on ties.
+        Frames no member covers are left out.
+        """
+        if len(members) == 1:
+            return [(members[0], start, end)]
+
+        spans = []
+        for src_id in members:
+            source = snapshot.sources[src_id]
+            tail = source.tc.get_frames(str(source.end_tc or ""))
+            first = max(start, head_ins[src_id])
+            last = end if tail is None else min(end, tail - 1)
+            if first <= last:
+                spans.append((first, last, src_id))
+
+        pieces = []
+        while start <= end:
+            covering = [span for span in spans if span[0] <= start <= span[1]]
+            if not covering:
+                later = [span[0] for span in spans if span[0] > start]
+                if not later:
+                    break
+                start = min(later)
+                continue
+            _, last, src_id = max(covering, key=lambda span: span[1])
+            pieces.append((src_id, start, last))
+            start = last + 1
+        return pieces
+
+    def get_occurences(
+        self, snapshot: ProjectSnapshot, head_ins: dict = None, columnar: bool = False
+    ):
+        """SourceUsage per source id, or one OccurrenceStore if `columnar`."""
+        if head_ins is None:
+            head_ins = snapshot.head_ins()
+
+        timelines = snapshot.timelines
+        self.progress.start("processing clips", sum(len(tl.clips) for tl in timelines))
+        collect = collect_occurrences if columnar else collect_usages
+        workers = min(self.compute_workers, len(timelines))
+        if workers <= 1:
+            return collect(
+                timelines,
+                head_ins,
+                self.color_to_skip,
+                self.tracks_to_skip,
+                self.progress,
+            )
 
+        # contiguous chunks merged in order give the same result as a serial run
+        size = -(-len(timelines) // workers)
+        chunks = [timelines[i : i + size] for i in range(0, len(timelines), size)]
+        occs = OccurrenceStore() if columnar else {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = pool.map(
+                collect,
+                chunks,
+                repeat(head_ins),
+                repeat(self.color_to_skip),
+                repeat(self.tracks_to_skip),
+            )
+            for chunk, part in zip(chunks, parts):
+                if columnar:
+                    occs.update(part)
+                else:
+                    for src_id, usage in part.items():
+                        occs.setdefault(src_id, SourceUsage()).update(usage)
+                self.progress.advance(sum(len(tl.clips) for tl in chunk))
         return occs
 
-    def merge(self):
-        pmanager = DVR_ProjectManager()
+    def scan(self) -> tuple[DVR_ProjectManager, ProjectSnapshot]:
+        with self.phase("timeline enumeration"):
+            pmanager = DVR_ProjectManager()
+
+            # query all timelines that match the given filters
+            # TODO: implement regex exclude
+            project_timelines = pmanager.all_timelines
+            names = [tl.name for tl in project_timelines]
+            all_timelines = [
+                tl
+                for tl, name in zip(project_timelines, names)
+                if self.timeline_filter.search(name)
+            ]
 
-        # query all timelines that match the given filters
-        # TODO: implement regex exclude
-        all_timelines = [
-            tl for tl in pmanager.all_timelines if self.timeline_filter.search(tl.name)
-        ]
+        log.info("scanning %d of %d timelines", len(all_timelines), len(names))
+        with self.phase("timeline scan"):
+            scan_cache = self.get_scan_cache(pmanager.current_project_name)
+            self.source_cache.store = self.get_source_store()
+            self.progress.start("scanning timelines", len(all_timelines))
+            snapshot = pmanager.snapshot(
+                all_timelines,
+                self.source_cache,
+                self.scan_workers,
+                scan_cache,
+                self.progress,
+            )
+        log.info(
+            "read %d timelines using %d sources",
+            len(snapshot.timelines),
+            len(snapshot.sources),
+        )
+        log.info("source cache: %s", self.source_cache.stats)
+        if scan_cache:
+            log.info("scan cache: %s", scan_cache.stats)
+            scan_cache.save()
+        self.__scan = (pmanager, snapshot)
+        self.__scan_time = datetime.now()
+        self.__project_timelines = names
+        return pmanager, snapshot
 
-        log.info("================================================")
-        occs = self.get_occurences(all_timelines)
-
-        # sort occurrences and remove duplicates
-        clip_map = {}
-        for src_id, src_v in occs.items():
-            clip_set = set([u["usage"] for u in src_v["usages"].values()])
-            clip_map[src_id] = sorted(clip_set, key=lambda k: k[0])
-            log.debug(f"{occs[src_id]['source'].properties = }")
-        log.info(f"{occs = }")
-        log.info(f"{clip_map = }")
-
-        # framelists = {k: set(range(v[0], v[1] + 1)) for k, v in clip_map.items()}
-        framelists = {}
-        for k, v in clip_map.items():
-            framelists[k] = [set(range(min(i), max(i))) for i in v]
-            log.debug(type(framelists[k]))
-            for i in framelists[k]:
-                log.debug(type(i))
-        log.info(f"{framelists = }")
-
-        blis = {}
-        for k, v in framelists.items():
-            foo = self.find_best_ranges(v)
-            for f in foo:
-                log.debug(f"{f = }")
-                log.debug(f"{len(f) = }")
-            blis[k] = self.find_best_ranges(v)
-            log.debug(f"{len(blis[k]) = }")
-        log.info(f"best length clips = {blis}")
+    @property
+    def has_scan(self) -> bool:
+        return self.__scan is not None
 
-        result = []
-        for k, v in blis.items():
-            tc_head_in = occs[k]["source"]._super.GetClipProperty("Start TC")
-            f_head_in = TC.get_frames(tc_head_in)
-            for i in v:
-                log.debug(TC.get_tc(min(i)))
-                log.debug(TC.get_tc(max(i)))
-                log.debug(f"{tc_head_in = }")
-                log.debug(f"{f_head_in = }")
-                start = min(i)
-                log.debug(f"{start = }")
-                end = max(i)
-                #   it's actually using relative frames. e.g. start of source 12:42:13:12 -> f0
-                result.append(
-                    {
-                        "mediaPoolItem": occs[k]["source"]._super,
-                        "startFrame": start - f_head_in,
-                        "endFrame": end - f_head_in,
-                        "mediaType": 1,
-                        "trackIndex": 1,
-                    }
+    @property
+    def scan_covers_filter(self) -> bool:
+        """Whether the last scan read every timeline the filter matches."""
+        if self.__scan is None:
+            return False
+        scanned = {tl.name for tl in self.__scan[1].timelines}
+        return all(
+            name in scanned
+            for name in self.__project_timelines
+            if self.timeline_filter.search(name)
+        )
+
+    def get_scan(
+        self, verify: bool = False
+    ) -> tuple[DVR_ProjectManager, ProjectSnapshot]:
+        """The last scan narrowed to the timeline filter, scans if it doesn't cover it.
+
+        Gap, clip color and track settings are applied by `compute`, changing
+        them never needs a new scan. With `verify` the timelines are scanned
+        again through the scan cache, only edited ones are read.
+        """
+        if not self.scan_covers_filter:
+            return self.scan()
+        if verify:
+            if self.scan_cache_dir is not None:
+                log.info("checking the last scan against the timeline fingerprints")
+                return self.scan()
+            log.warning(
+                "reusing the scan of %s without checking it, Rescan after edits",
+                self.__scan_time.strftime("%H:%M:%S"),
+            )
+        pmanager, snapshot = self.__scan
+        names = {n for n in self.__project_timelines if self.timeline_filter.search(n)}
+        return pmanager, snapshot.subset(names)
+
+    def invalidate(self):
+        """Forgets the last scan, the next one still skips unchanged timelines."""
+        self.__scan = None
+        self.__scan_time = None
+        self.__project_timelines = []
+
+    def clear_caches(self):
+        """Forgets the last scan and all cached timelines and sources.
+
+        Needed after relinking media, which keeps the media pool items.
+        """
+        if self.__scan is None:
+            project_name = DVR_ProjectManager().current_project_name
+        else:
+            project_name = self.__scan[1].name
+        self.invalidate()
+        self.source_cache.invalidate()
+        source_store = self.get_source_store()
+        if source_store is not None:
+            # other edits of a pool item, like its Reel Name, keep its key
+            source_store.purge(everything=True)
+        scan_cache = self.get_scan_cache(project_name)
+        if scan_cache is not None:
+            scan_cache.clear()
+
+    def preview(self) -> tuple[int, int]:
+        """Plate count and total frames of a merge with the current settings."""
+        pmanager, snapshot = self.get_scan()
+        clip_infos = self.compute(snapshot)
+        frames = sum(i["endFrame"] - i["startFrame"] + 1 for i in clip_infos)
+        return len(clip_infos), frames
+
+    def compute(self, snapshot: ProjectSnapshot) -> list[dict]:
+        """Merged clip infos of `snapshot`, their source given by id."""
+        items = sum(len(tl.clips) for tl in snapshot.timelines)
+        columnar = items >= self.columnar_threshold
+        with self.phase("occurrence scan"):
+            head_ins = snapshot.head_ins()
+            occs = self.get_occurences(snapshot, head_ins, columnar)
+
+        # usages come sorted and deduplicated, as closed [start, end] frame
+        # intervals (same frames as range(in, out))
+        if columnar:
+            usages, sources = len(occs), len(occs.source_ids)
+            per_source = occs.intervals()
+        else:
+            usages, sources = sum(u.count for u in occs.values()), len(occs)
+            per_source = ((k, v.intervals) for k, v in occs.items())
+        log.info("%d usages of %d sources", usages, sources)
+        log.debug("occs = %s", _Summary(occs))
+
+        # sources with the same merge key share their ranges
+        with self.phase("grouping"):
+            if self.dedupe_media:
+                canonical = snapshot.key_index.canonical()
+                per_source, duplicates = self.dedupe_sources(per_source, canonical)
+            group_of = snapshot.key_index.groups(self.mode)
+            groups, members = {}, {}
+            for src_id, intervals in per_source:
+                group = group_of[src_id]
+                groups.setdefault(group, []).extend(intervals)
+                members.setdefault(group, []).append(src_id)
+        log.info("merging by %r: %d groups", self.mode, len(groups))
+        if self.dedupe_media:
+            self.log_dedupe(duplicates)
+
+        with self.phase("range selection"):
+            self.progress.start("merging ranges", len(groups))
+            blis = {}
+            for k, v in groups.items():
+                blis[k] = self.find_best_ranges(v)
+                self.progress.advance()
+        log.debug("best length clips = %s", _Summary(blis))
+
+        debug = log.isEnabledFor(logging.DEBUG)
+        with self.phase("clip info build"):
+            result = []
+            for group, v in blis.items():
+                pieces = (
+                    piece
+                    for start, end in v
+                    for piece in self.split_range(
+                        snapshot, members[group], head_ins, start, end
+                    )
                 )
-        log.info(f"{result = }")
+                for k, start, end in pieces:
+                    source = snapshot.sources[k]
+                    f_head_in = head_ins[k]
+                    if debug:
+                        log.debug(
+                            "%s: %s - %s, head in %s (%d)",
+                            source.name,
+                            source.tc.get_tc(start),
+                            source.tc.get_tc(end),
+                            source.start_tc,
+                            f_head_in,
+                        )
+                    #   it's actually using relative frames. e.g. start of source 12:42:13:12 -> f0
+                    result.append(
+                        {
+                            "source": k,
+                            "startFrame": start - f_head_in,
+                            "endFrame": end - f_head_in,
+                            "mediaType": 1,
+                            "trackIndex": 1,
+                        }
+                    )
+        log.info("merged into %d clips", len(result))
+        log.debug("result = %s", _Summary(result))
+        return result
 
+    def create_timeline(
+        self, pmanager, snapshot: ProjectSnapshot, clip_infos
+    ) -> list[dict]:
+        """Creates the merged timeline, returns the clip infos that failed."""
         # create timeline
-        pmanager.mediapool.CreateEmptyTimeline(self.timeline_out)
-        pmanager.mediapool.AppendToTimeline(result)
+        timeline = pmanager.mediapool.CreateEmptyTimeline(self.timeline_out)
+        if not timeline:
+            raise RuntimeError("Couldn't create timeline.", self.timeline_out)
+        # items on its first video track, all clip infos go there
+        self.__appended = 0
+
+        chunks = [
+            clip_infos[i : i + self.append_chunk_size]
+            for i in range(0, len(clip_infos), self.append_chunk_size)
+        ]
+        self.progress.start("appending clips", len(clip_infos))
+        failed = []
+        for n, chunk in enumerate(chunks, 1):
+            start = time.perf_counter()
+            self.append_chunk(pmanager.mediapool, timeline, snapshot, chunk, failed)
+            seconds = time.perf_counter() - start
+            log.info(
+                "appended chunk %d/%d, %d clips in %.3fs",
+                n,
+                len(chunks),
+                len(chunk),
+                seconds,
+            )
+            if self.report is not None:
+                self.report.info.setdefault("append_chunks", []).append(
+                    {"clips": len(chunk), "seconds": round(seconds, 4)}
+                )
+            self.progress.advance(len(chunk))
 
-        return
+        if failed:
+            log.warning(
+                "%d clips couldn't be appended: %s", len(failed), _Summary(failed)
+            )
+        return failed
+
+    def append_chunk(
+        self, mediapool, timeline, snapshot: ProjectSnapshot, chunk, failed
+    ):
+        """Appends `chunk`, retrying and then bisecting the clip infos that are missing.
+
+        Clip infos that fail on their own are skipped and added to `failed`.
+        Retried ones end up after the ones appended right away.
+        """
+        for attempt in range(1 + self.append_retries):
+            result = [
+                {
+                    "mediaPoolItem": snapshot.pool_item(info["source"]),
+                    "startFrame": info["startFrame"],
+                    "endFrame": info["endFrame"],
+                    "mediaType": info["mediaType"],
+                    "trackIndex": info["trackIndex"],
+                }
+                for info in chunk
+            ]
+            try:
+                items = mediapool.AppendToTimeline(result) or []
+            except Exception as err:
+                log.warning("appending %d clips raised: %s", len(chunk), err)
+                # it may have appended some of them before, don't append those twice
+                items = timeline.GetItemListInTrack("video", 1)[self.__appended :]
+            self.__appended += len(items)
+            if len(items) == len(chunk):
+                return
+            if items:
+                chunk = self.missing_clip_infos(chunk, items)
+                log.warning("%d of %d clips not appended", len(chunk), len(result))
+            log.info("appending %d clips failed, attempt %d", len(chunk), attempt + 1)
+
+        if len(chunk) == 1:
+            log.warning("skipping clip info %s", chunk[0])
+            failed.append(chunk[0])
+            return
+        # halves that work are appended as they are, in order
+        mid = len(chunk) // 2
+        self.append_chunk(mediapool, timeline, snapshot, chunk[:mid], failed)
+        self.append_chunk(mediapool, timeline, snapshot, chunk[mid:], failed)
+
+    @staticmethod
+    def missing_clip_infos(chunk, items) -> list[dict]:
+        """Clip infos of `chunk` without one of the appended timeline `items`.
+
+        Items come in the order of their clip infos, matched by pool item and
+        source in.
+        """
+        keys = []
+        for item in items:
+            pool_item = item.GetMediaPoolItem()
+            src_id = pool_item.GetUniqueId() if pool_item else None
+            keys.append((src_id, item.GetLeftOffset()))
+
+        missing = []
+        i = 0
+        for info in chunk:
+            if i < len(keys) and keys[i] == (info["source"], info["startFrame"]):
+                i += 1
+            else:
+                missing.append(info)
+        return missing
+
+    def phase(self, name: str):
+        """Times the block as phase `name` of the current run report, if any."""
+        if self.report is None:
+            return nullcontext()
+        return self.report.phase(name)
+
+    def merge(self) -> list[dict]:
+        return self.finish_merge(*self.prepare_merge())
+
+    def prepare_merge(self) -> tuple[DVR_ProjectManager, ProjectSnapshot, list]:
+        """Scan and compute of a merge, can run on a worker thread."""
+        if api_stats is not None:
+            api_stats.reset()
+        self.report = RunReport()
+        try:
+            with self.report.capture():
+                pmanager, snapshot = self.get_scan(verify=True)
+                clip_infos = self.compute(snapshot)
+        except BaseException:
+            # a cancelled or failed run has no report, previews mustn't add to it
+            self.report = None
+            raise
+        return pmanager, snapshot, clip_infos
+
+    def finish_merge(
+        self, pmanager, snapshot: ProjectSnapshot, clip_infos
+    ) -> list[dict]:
+        """Creates the merged timeline, belongs on the main thread.
+
+        Returns the clip infos that couldn't be appended.
+        """
+        try:
+            with self.report.capture(), self.phase("timeline creation"):
+                failed = self.create_timeline(pmanager, snapshot, clip_infos)
+        finally:
+            report, self.report = self.report, None
+        if api_stats is not None:
+            log.info("scripting API calls:\n%s", api_stats.table(api_stats_top))
+
+        report.info.update(
+            project=snapshot.name,
+            timelines=len(snapshot.timelines),
+            sources=len(snapshot.sources),
+            clip_infos=len(clip_infos),
+            gapsize=self.gapsize,
+            merge_key=self.mode,
+            dedupe_media=self.dedupe_media,
+            timeline_filter=self.timeline_filter.pattern,
+            scan_workers=self.scan_workers,
+            compute_workers=self.compute_workers,
+            append_chunk_size=self.append_chunk_size,
+            failed_clip_infos=failed,
+        )
+        if api_stats is not None:
+            report.info["api_calls"] = dict(api_stats.calls)
+        report.write()
+
+        return failed
+
+    def export_snapshot(self, path=None) -> Path:
+        pmanager, snapshot = self.get_scan()
+        if not path:
+            path = Path.home() / "logs" / f"{snapshot.name}.snapshot.json.gz"
+        snapshot.dump(path)
+        log.info("wrote snapshot to %s", path)
+        return Path(path)
 
 
 class UI:
@@ -628,6 +2476,8 @@ class UI:
         self.merger = Merger(fu)
         self.ui_manager = self.fu.UIManager
         self.ui_dispatcher = bmd.UIDispatcher(self.ui_manager)
+        # merge or scan running in the background, see `poll_merge`
+        self.job: MergeJob = None
 
         # self.load_config()
         self.create_ui()
@@ -747,6 +2597,18 @@ class UI:
                                         "SingleStep": 1,
                                     }
                                 ),
+                                self.ui_manager.Label(
+                                    {"Text": "Scan Threads:", "Weight": 0}
+                                ),
+                                self.ui_manager.SpinBox(
+                                    {
+                                        "ID": "scan_workers",
+                                        "Value": 1,
+                                        "Minimum": 1,
+                                        "Maximum": 16,
+                                        "SingleStep": 1,
+                                    }
+                                ),
                             ],
                         ),
                         self.ui_manager.HGroup(
@@ -762,12 +2624,28 @@ class UI:
                                 self.ui_manager.ComboBox(
                                     {
                                         "ID": "merge_key",
+                                        # any clip property or metadata field
+                                        "Editable": True,
                                         "Alignment": {"AlignLeft": True},
                                         "Weight": 0.5,
                                     }
                                 ),
                             ],
                         ),
+                        self.ui_manager.HGroup(
+                            {"Spacing": 5, "Weight": 0},
+                            [
+                                self.ui_manager.CheckBox(
+                                    {
+                                        "ID": "dedupe_media",
+                                        "Text": "Merge Duplicate Imports",
+                                        "Checked": False,
+                                        "Checkable": True,
+                                        "Events": {"Toggled": True},
+                                    }
+                                ),
+                            ],
+                        ),
                         self.ui_manager.Label(
                             {
                                 "StyleSheet": "max-height: 1px; background-color: rgb(10,10,10)"
@@ -786,13 +2664,50 @@ class UI:
                             {"Spacing": 15, "Weight": 3},
                             [
                                 self.selection_group,
-                                self.ui_manager.Button(
-                                    {
-                                        "ID": "merge_button",
-                                        "Text": "Merge",
-                                        "Weight": 0,
-                                        "Enabled": True,
-                                    }
+                                self.ui_manager.HGroup(
+                                    {"Spacing": 5, "Weight": 0},
+                                    [
+                                        self.ui_manager.Button(
+                                            {
+                                                "ID": "merge_button",
+                                                "Text": "Merge",
+                                                "Weight": 1,
+                                                "Enabled": True,
+                                            }
+                                        ),
+                                        self.ui_manager.Button(
+                                            {
+                                                "ID": "cancel_button",
+                                                "Text": "Cancel",
+                                                "Weight": 0,
+                                                "Enabled": False,
+                                            }
+                                        ),
+                                        self.ui_manager.Button(
+                                            {
+                                                "ID": "rescan_button",
+                                                "Text": "Rescan",
+                                                "Weight": 0,
+                                                "Enabled": True,
+                                            }
+                                        ),
+                                        self.ui_manager.Button(
+                                            {
+                                                "ID": "clear_cache_button",
+                                                "Text": "Clear Cache",
+                                                "Weight": 0,
+                                                "Enabled": True,
+                                            }
+                                        ),
+                                        self.ui_manager.Button(
+                                            {
+                                                "ID": "export_button",
+                                                "Text": "Export Snapshot",
+                                                "Weight": 0,
+                                                "Enabled": True,
+                                            }
+                                        ),
+                                    ],
                                 ),
                                 self.ui_manager.Label(
                                     {
@@ -823,16 +2738,35 @@ class UI:
             },
             self.window_01,
         )
+        # polls the job running in the background, see `poll_merge`
+        self.merge_timer = self.ui_manager.Timer(
+            {"ID": "merge_timer", "Interval": 250, "SingleShot": False}
+        )
 
     def init_ui_defaults(self):
         items = self.main_window.GetItems()
         items["clip_colors"].AddItems(clipcolor_names)
-        items["merge_key"].AddItems(["Source File"])
+        items["merge_key"].AddItems(
+            ["Source File", "Reel Name", "File Name", "File Path"]
+        )
 
     def init_ui_callbacks(self):
         self.main_window.On["ui.main"].Close = self.destroy
         self.main_window.On["merge_button"].Clicked = self.merge
+        self.main_window.On["cancel_button"].Clicked = self.cancel
+        self.main_window.On["rescan_button"].Clicked = self.rescan
+        self.main_window.On["clear_cache_button"].Clicked = self.clear_cache
+        self.ui_dispatcher.On["merge_timer"].Timeout = self.poll_merge
+        self.main_window.On["export_button"].Clicked = self.export_snapshot
+        # settings changes only refresh the preview of the last scan
         self.main_window.On["include_only"].TextChanged = self.update
+        self.main_window.On["exclude_tracks"].TextChanged = self.update
+        self.main_window.On["shall_exclude_tracks"].Toggled = self.update
+        self.main_window.On["skip_clip_color"].Toggled = self.update
+        self.main_window.On["clip_colors"].CurrentIndexChanged = self.update
+        self.main_window.On["merge_gap"].ValueChanged = self.update
+        self.main_window.On["merge_key"].CurrentIndexChanged = self.update
+        self.main_window.On["dedupe_media"].Toggled = self.update
 
     @property
     # ? should we combine timeline and color filter into 1 object
@@ -850,7 +2784,7 @@ class UI:
     @property
     def tracks_to_skip(self) -> list[str]:
         res = str(self.main_window.Find("exclude_tracks").Text)
-        log.debug(f"{res = }")
+        log.debug("exclude_tracks = %r", res)
         if not "," in res:
             return [res]
         else:
@@ -868,52 +2802,202 @@ class UI:
     def merge_gap(self) -> int:
         return int(self.main_window.Find("merge_gap").Value)
 
+    @property
+    def scan_workers(self) -> int:
+        return int(self.main_window.Find("scan_workers").Value)
+
     @property
     def merge_mode(self) -> str:
         return str(self.main_window.Find("merge_key").CurrentText)
 
+    @property
+    def dedupe_media(self) -> bool:
+        return bool(self.main_window.Find("dedupe_media").Checked)
+
     def start(self):
         self.main_window.Show()
         self.ui_dispatcher.RunLoop()
         self.main_window.Hide()
 
     def destroy(self, event=None):
+        if self.busy:
+            self.job.progress.cancel()
+            self.merge_timer.Stop()
         self.ui_dispatcher.ExitLoop()
         if event:
             log.debug(event)
 
+    def configure_merger(self):
+        self.merger.timeline_out = self.timeline_out
+        self.merger.timeline_filter = self.filter
+        self.merger.color_to_skip = self.color_to_skip if self.shall_skip_color else ""
+        self.merger.tracks_to_skip = (
+            self.tracks_to_skip if self.shall_skip_tracks else []
+        )
+        self.merger.mode = self.merge_mode
+        self.merger.dedupe_media = self.dedupe_media
+        self.merger.gapsize = self.merge_gap
+        self.merger.scan_workers = self.scan_workers
+
+    @property
+    def busy(self) -> bool:
+        return self.job is not None
+
+    def set_busy(self, busy: bool):
+        items = self.main_window.GetItems()
+        for button in [
+            "merge_button",
+            "rescan_button",
+            "clear_cache_button",
+            "export_button",
+        ]:
+            items[button].Enabled = not busy
+        items["cancel_button"].Enabled = busy
+
     def merge(self, event=None):
         if event:
             log.debug(event)
-        log.debug(f"{self.merge_gap = }")
+        if self.busy:
+            return
         try:
-            # prepare timeline merger
-            log.debug(self.tracks_to_skip)
-            DVR_Timeline.set_track_filter(self.tracks_to_skip)
-            self.merger.timeline_out = self.timeline_out
-            self.merger.timeline_filter = self.filter
-            self.merger.color_to_skip = (
-                self.color_to_skip if self.shall_skip_color else ""
-            )
-            self.merger.tracks_to_skip = (
-                self.tracks_to_skip if self.shall_skip_tracks else []
-            )
-            self.merger.mode = self.merge_mode
-            self.merger.gapsize = self.merge_gap
+            self.configure_merger()
+        except Exception as err:
+            log.exception(err, stack_info=True)
+            return
+        # scan and compute in the background, the UI stays responsive
+        self.start_job(MergeJob(self.merger))
+
+    def start_job(self, job: MergeJob):
+        self.job = job
+        self.set_busy(True)
+        self.job.start()
+        self.merge_timer.Start()
+
+    def cancel(self, event=None):
+        if event:
+            log.debug(event)
+        if self.busy:
+            self.job.progress.cancel()
+            self.main_window.Find("status").Text = "Cancelling..."
+
+    def poll_merge(self, event=None):
+        status = self.main_window.Find("status")
+        if self.job.is_alive():
+            if not self.job.progress.cancelled:
+                status.Text = str(self.job.progress)
+            return
+
+        self.merge_timer.Stop()
+        job, self.job = self.job, None
+        self.set_busy(False)
+        if isinstance(job.error, MergeCancelled):
+            status.Text = f"{job.label} cancelled"
+            return
+        if job.error is not None:
+            log.error("%s failed: %s", job.name, job.error, exc_info=job.error)
+            status.Text = f"{job.label} failed: {job.error}"
+            return
+        if isinstance(job, ScanJob):
+            self.update()
+            return
+        try:
+            # the scripting API wants timelines created from the main thread
+            status.Text = "Creating timeline..."
+            failed = self.merger.finish_merge(*job.result)
+            self.update()
+            if failed:
+                status.Text = f"{len(failed)} clips couldn't be appended, see the log"
+        except Exception as err:
+            log.exception(err, stack_info=True)
+            status.Text = f"Merge failed: {err}"
+
+    def rescan(self, event=None):
+        if event:
+            log.debug(event)
+        if self.busy:
+            return
+        try:
+            self.configure_merger()
+            self.merger.invalidate()
+        except Exception as err:
+            log.exception(err, stack_info=True)
+            return
+        self.start_job(ScanJob(self.merger))
+
+    def clear_cache(self, event=None):
+        if event:
+            log.debug(event)
+        if self.busy:
+            return
+        try:
+            self.configure_merger()
+            self.merger.clear_caches()
+        except Exception as err:
+            log.exception(err, stack_info=True)
+            return
+        self.start_job(ScanJob(self.merger))
 
-            # do the merge
-            self.merger.merge()
+    def export_snapshot(self, event=None):
+        if event:
+            log.debug(event)
+        if self.busy:
+            return
+        try:
+            self.merger.timeline_filter = self.filter
+            path = self.merger.export_snapshot()
+            self.main_window.Find("status").Text = f"Snapshot: {path.name}"
         except Exception as err:
             log.exception(err, stack_info=True)
 
     def update(self, event=None):
-        # TODO: well...
+        """Previews the merge of the last scan with the current settings."""
         if event:
             log.debug(event)
+        if self.busy:
+            # the merger belongs to the running job until it's done
+            return
+        status = self.main_window.Find("status")
+        try:
+            self.configure_merger()
+        except re.error:
+            status.Text = "Invalid timeline regex"
+            return
+        if not self.merger.scan_covers_filter:
+            # scanning on every keystroke would be way too slow
+            status.Text = "Rescan to preview"
+            return
+        try:
+            plates, frames = self.merger.preview()
+            status.Text = f"{plates} plates, {frames} frames"
+        except Exception as err:
+            log.exception(err, stack_info=True)
+
 
+class _Summary:
+    """Size-capped repr of a log argument, only built if the record is emitted."""
 
-def get_logger() -> logging.Logger:
+    __slots__ = ("obj",)
+    limits = reprlib.Repr()
+    limits.maxlevel = 3
+    limits.maxdict = limits.maxlist = limits.maxtuple = limits.maxset = 8
+    limits.maxstring = limits.maxother = 120
+
+    def __init__(self, obj) -> None:
+        self.obj = obj
+
+    def __str__(self) -> str:
+        res = self.limits.repr(self.obj)
+        if hasattr(self.obj, "__len__"):
+            return f"({len(self.obj)} items) {res}"
+        return res
+
+
+def get_logger() -> tuple[logging.Logger, QueueListener]:
+    """Logger handing its records to a listener thread doing the actual I/O."""
     log = logging.getLogger(__name__)
+    # Resolve reuses its interpreter, drop the handlers of a previous run
+    for old in list(log.handlers):
+        log.removeHandler(old)
     formatter = logging.Formatter(
         "[%(filename)s:%(lineno)d] %(asctime)s %(levelname)-8s %(message)s"
     )
@@ -922,12 +3006,10 @@ def get_logger() -> logging.Logger:
     errhandler = logging.StreamHandler(sys.stderr)
     errhandler.setLevel(logging.ERROR)
     errhandler.setFormatter(formatter)
-    log.addHandler(errhandler)
 
     handler = logging.StreamHandler(sys.stdout)
     handler.setLevel(logging.DEBUG)
     handler.setFormatter(formatter)
-    log.addHandler(handler)
 
     log_path = Path.home() / "logs" / "dvr.log"
     log_path.parent.mkdir(parents=True, exist_ok=True)
@@ -936,20 +3018,34 @@ def get_logger() -> logging.Logger:
     filehandler = RotatingFileHandler(log_path, **log_handler_paras)
     filehandler.setLevel(logging.DEBUG)
     filehandler.setFormatter(formatter)
-    log.addHandler(filehandler)
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(
+        records, errhandler, handler, filehandler, respect_handler_level=True
+    )
+    log.addHandler(QueueHandler(records))
+    listener.start()
+    # flush whatever is still queued when the interpreter exits
+    atexit.register(listener.stop)
 
     log.setLevel(logging.INFO)
-    log.info(f"{_spacer}")
-    log.debug(log_handler_paras["maxBytes"])
-    log.debug(f"{dir(bmd.scriptapp('Resolve')) = }")
-    log.debug(f"{dir(bmd.scriptapp('Fusion')) = }")
-    log.debug(f"{dir(bmd.scriptobject) = }")
-    log.debug(f"{dir(bmd) = }")
-    return log
+    log.info(_spacer)
+    log.debug("maxBytes = %d", log_handler_paras["maxBytes"])
+    return log, listener
 
 
 # so much bad i'm stopid let's goo ✨
 _spacer: str = "#" * 42
-log = get_logger()
-app = UI(bmd.scriptapp("Fusion"))
-app.start()
+log, log_listener = get_logger()
+
+# bmd only exists when we're run from inside Resolve, see merge_cli.py otherwise
+if "bmd" in globals():
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Resolve: %s", dir(bmd.scriptapp("Resolve")))
+        log.debug("Fusion: %s", dir(bmd.scriptapp("Fusion")))
+        log.debug("bmd: %s", dir(bmd))
+    app = UI(bmd.scriptapp("Fusion"))
+    app.start()
+    # Resolve keeps its interpreter around, don't leave the thread behind
+    atexit.unregister(log_listener.stop)
+    log_listener.stop()
@@ -0,0 +1,102 @@
+"""Runs the timeline merge against a project snapshot, no Resolve needed.
+
+Snapshots are written from inside Resolve with the "Export Snapshot" button.
+
+    python merge_cli.py ~/logs/my_project.snapshot.json.gz --gap 10 -o merged.json
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import main
+from main import Merger, ProjectSnapshot
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshot", type=Path, help="snapshot file (.json or .json.gz)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="where to write the merged clip infos (default: <snapshot>.clips.json)",
+    )
+    parser.add_argument(
+        "--include", default="^.+$", help="only merge timelines matching this regex"
+    )
+    parser.add_argument("--gap", type=int, default=10, help="merge gap in frames")
+    parser.add_argument(
+        "--merge-by",
+        default="Source File",
+        help='merge key, e.g. "Reel Name" or "File Path + Start TC"',
+    )
+    parser.add_argument(
+        "--dedupe-media",
+        action="store_true",
+        help="merge media pool items of the same file (File Path and Start TC) as one",
+    )
+    parser.add_argument("--skip-color", default="", help="skip clips with this color")
+    parser.add_argument(
+        "--exclude-tracks",
+        default="",
+        help="comma separated video track names to skip",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes collecting usages, 1 runs everything in this process",
+    )
+    parser.add_argument(
+        "--columnar-threshold",
+        type=int,
+        default=100_000,
+        help="timeline items from which usages are kept in int64 columns, 0 always",
+    )
+    parser.add_argument(
+        "--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"]
+    )
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> list[dict]:
+    snapshot = ProjectSnapshot.load(args.snapshot)
+
+    merger = Merger(None)
+    merger.timeline_filter = args.include
+    merger.gapsize = args.gap
+    merger.mode = args.merge_by
+    merger.dedupe_media = args.dedupe_media
+    merger.compute_workers = args.workers
+    merger.columnar_threshold = args.columnar_threshold
+    merger.color_to_skip = args.skip_color
+    merger.tracks_to_skip = [
+        i.strip() for i in args.exclude_tracks.split(",") if i.strip()
+    ]
+
+    snapshot.timelines = [
+        tl for tl in snapshot.timelines if merger.timeline_filter.search(tl.name)
+    ]
+    result = merger.compute(snapshot)
+    for info in result:
+        info["name"] = snapshot.sources[info["source"]].name
+    return result
+
+
+def cli(argv=None) -> int:
+    args = parse_args(argv)
+    main.log.setLevel(args.log_level)
+
+    result = run(args)
+
+    output = args.output or args.snapshot.with_name(
+        args.snapshot.name.split(".")[0] + ".clips.json"
+    )
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"{len(result)} clips written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
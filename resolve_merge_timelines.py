@@ -135,14 +135,99 @@ class SMPTE(object):
                 )
 
 
+class PoolInfo(object):
+    '''Media pool item properties, fetched once and shared by all its plates.'''
+    __slots__ = ('pool_item', 'pool_name', 'pool_file_name', 'pool_reel', 'start_tc', 'end_tc')
+
+    def __init__(self, pool_item=None):
+        self.pool_item = pool_item
+        self.pool_name = pool_item.GetClipProperty('Clip Name') if pool_item is not None else None
+        self.pool_file_name = pool_item.GetClipProperty('File Name') if pool_item is not None else None
+        self.pool_reel = pool_item.GetClipProperty('Reel Name') if pool_item is not None else None
+        self.start_tc = pool_item.GetClipProperty('Start TC') if pool_item is not None else None
+        self.end_tc = pool_item.GetClipProperty('End TC') if pool_item is not None else None
+
+
+class Plate(object):
+    '''One timeline item to merge.'''
+    __slots__ = (
+        'timeline', 'timeline_name', 'item', 'info',
+        'track_number', 'track_name', 'track_index',
+        'name', 'color', 'edit_in', 'edit_out', 'head', 'tail', 'duration',
+        'start_tc_num', 'end_tc_num',
+        'merge_children', 'merge_children_names', 'merge_parent', 'merge_out',
+    )
+
+    def __init__(self, timeline, timeline_name, item, info, track_number, track_name, track_index):
+        self.timeline = timeline
+        self.timeline_name = timeline_name
+        self.item = item
+        self.info = info
+        self.track_number = track_number
+        self.track_name = track_name
+        self.track_index = track_index
+        self.name = item.GetName()
+        self.color = None
+        self.edit_in = item.GetStart()
+        self.edit_out = item.GetEnd()
+        self.head = item.GetLeftOffset()
+        self.tail = item.GetRightOffset()
+        self.duration = item.GetDuration()
+        self.start_tc_num = None
+        self.end_tc_num = None
+        # shared empty tuples until the plate gets merge children, see merge_plates
+        self.merge_children = ()
+        self.merge_children_names = ()
+        self.merge_parent = None
+        self.merge_out = 0
+
+    def __repr__(self):
+        return '<Plate {} {}-{} parent={} children={}>'.format(
+            self.long_name, self.edit_in, self.edit_out, self.merge_parent, list(self.merge_children)
+        )
+
+    @property
+    def pool_item(self):
+        return self.info.pool_item
+
+    @property
+    def pool_name(self):
+        return self.info.pool_name
+
+    @property
+    def pool_file_name(self):
+        return self.info.pool_file_name
+
+    @property
+    def pool_reel(self):
+        return self.info.pool_reel
+
+    @property
+    def start_tc(self):
+        return self.info.start_tc
+
+    @property
+    def end_tc(self):
+        return self.info.end_tc
+
+    @property
+    def long_name(self):
+        return '-'.join([self.timeline_name, str(self.track_number), self.track_index, self.name])
+
+
+# plates of timeline items without a media pool item
+no_pool_info = PoolInfo()
+
+
 class ResolveProject:
     def __init__(self) -> None:
         self.project_manager = resolve.GetProjectManager()
         self.current_project = self.project_manager.GetCurrentProject()
         self.project_name = self.current_project.GetName()
 
-        # list of timelines in the project
+        # list of timelines in the project, fetched once, see refresh_timelines
         self.all_timelines = []
+        self.timelines_loaded = False
 
         # filtered timeline names
         self.selected_tl_names = []
@@ -193,12 +278,19 @@ class ResolveProject:
                     'to_merge' : False
                 }
             all_tl.append(tl_info)
-            self.all_timelines = sorted(all_tl, key=lambda k: (k['name'], k['in']))
+        self.all_timelines = sorted(all_tl, key=lambda k: (k['name'], k['in']))
+        self.timelines_loaded = True
         return self.all_timelines
-    
+
+    def refresh_timelines(self):
+        '''Fetches the timeline inventory again, e.g. after timelines were added.'''
+        return self.get_all_timelines_in_current_project()
+
     def filter_timelines(self, include=''):
 
-        self.get_all_timelines_in_current_project()
+        # filtering only works on the cached inventory, no API calls
+        if not self.timelines_loaded:
+            self.get_all_timelines_in_current_project()
         tl_to_merge = []
         if self.all_timelines:
             for one in self.all_timelines:
@@ -207,12 +299,15 @@ class ResolveProject:
                     tl_to_merge.append(one['name'])
                 else:
                     one['to_merge'] = False
-        self.selected_tl_names = sorted(tl_to_merge)
+        # all_timelines is sorted by name already
+        self.selected_tl_names = tl_to_merge
         return self.selected_tl_names
     
     def get_plates(self, skip_color='Orange'):
 
         plate_list = []
+        # pool item properties by unique id, plates of the same item share them
+        pool_infos = {}
         for one_tl in self.all_timelines:
             if not one_tl['to_merge']:
                 continue
@@ -222,44 +317,24 @@ class ResolveProject:
                 trck_name = one_tl['item'].GetTrackName('video', trck)
                 print(f"{trck_name = }")
                 trck_items = one_tl['item'].GetItemListInTrack('video', trck)
-                for itm in trck_items:
-                    pool_item = itm.GetMediaPoolItem()
+                for itm_index, itm in enumerate(trck_items):
                     clip_color = itm.GetClipColor()
-                    ignore = False
-                    if skip_color:
-                        if skip_color == clip_color:
-                            ignore = True
-                    if not ignore:
-                        clip_info = {
-                            'timeline': one_tl['item'],
-                            'timeline_name': one_tl['name'],
-                            'item': itm,
-                            'pool_item': pool_item,
-                            'track_number': trck,
-                            'track_name': trck_name,
-                            'track_index': str(trck_items.index(itm)).zfill(4),
-                            'name': itm.GetName(),
-                            'color': clip_color,
-                            'in': itm.GetStart(),
-                            'out': itm.GetEnd(),
-                            'head': itm.GetLeftOffset(),
-                            'tail': itm.GetRightOffset(),
-                            'duration': itm.GetDuration(),
-                            'pool_name': pool_item.GetClipProperty('Clip Name') if pool_item is not None else None,
-                            'pool_file_name': pool_item.GetClipProperty('File Name') if pool_item is not None else None,
-                            'pool_reel': pool_item.GetClipProperty('Reel Name') if pool_item is not None else None,
-                            'start_tc': pool_item.GetClipProperty('Start TC') if pool_item is not None else None,
-                            'end_tc': pool_item.GetClipProperty('End TC') if pool_item is not None else None,
-                            'merge_children': [],
-                            'merge_children_names': [],
-                            'merge_parent': None,
-                            'merge_out':0
-                        }
-
-                        clip_info['long_name'] = '-'.join([clip_info['timeline_name'], str(clip_info['track_number']), clip_info['track_index'], clip_info['name']])
-                        clip_info['start_tc_num'] = self.smpte.get_frames(clip_info['start_tc'])
-                        clip_info['end_tc_num'] = self.smpte.get_frames(clip_info['end_tc'])
-                        plate_list.append(clip_info)
+                    if skip_color and skip_color == clip_color:
+                        continue
+                    pool_item = itm.GetMediaPoolItem()
+                    if pool_item is None:
+                        info = no_pool_info
+                    else:
+                        pool_id = pool_item.GetUniqueId()
+                        info = pool_infos.get(pool_id)
+                        if info is None:
+                            info = pool_infos[pool_id] = PoolInfo(pool_item)
+
+                    plate = Plate(one_tl['item'], one_tl['name'], itm, info, trck, trck_name, str(itm_index).zfill(4))
+                    plate.color = clip_color
+                    plate.start_tc_num = self.smpte.get_frames(info.start_tc)
+                    plate.end_tc_num = self.smpte.get_frames(info.end_tc)
+                    plate_list.append(plate)
         self.plates = plate_list
 
     def split_plates_by_reel(self, key='pool_reel'):
@@ -268,13 +343,14 @@ class ResolveProject:
         plate_grps = {}
         if self.plates and len(self.plates) > 0:
             for one in self.plates:
-                if one[key] not in plate_grps.keys():
-                    plate_grps[one[key]] = [one]
+                group = getattr(one, key)
+                if group not in plate_grps:
+                    plate_grps[group] = [one]
                 else:
-                    plate_grps[one[key]].append(one)
+                    plate_grps[group].append(one)
         # sort plate groups by in point
         for k, v in plate_grps.items():
-            plate_grps[k] = sorted(v, key=lambda kk: (kk['in'], kk['duration']))
+            plate_grps[k] = sorted(v, key=lambda kk: (kk.edit_in, kk.duration))
 
         self.plate_groups = plate_grps
 
@@ -282,44 +358,48 @@ class ResolveProject:
 
         self.merge_summary = {}
         if self.plate_groups and len(self.plate_groups) > 0:
+            # one sweep per group, plates are sorted by in point already
             for k, v in self.plate_groups.items():
                 merge_index = 0
-                for plate in v:
-                    group_index = v.index(plate)
+                parent = None
+                for group_index, plate in enumerate(v):
                     if group_index == 0:
-                        plate['merge_children'] = []
-                        plate['merge_parent'] = None
-                        plate['merge_out'] =  plate['out']
+                        plate.merge_children = []
+                        plate.merge_parent = None
+                        plate.merge_out =  plate.edit_out
                         merge_index = group_index
+                        parent = plate
                         continue
 
-                    if plate['in'] - max_gap <= v[merge_index]['merge_out']:
+                    if plate.edit_in - max_gap <= parent.merge_out:
                         # to be merged
-                        v[merge_index]['merge_children'].append(group_index)
-                        v[merge_index]['merge_children_names'].append(plate['long_name'])
-                        plate['merge_parent'] = merge_index
-                        if plate['out'] > v[merge_index]['merge_out']:
-                            v[merge_index]['merge_out'] = plate['out']
+                        if not parent.merge_children_names:
+                            # first child, replace the shared empty tuples
+                            parent.merge_children = list(parent.merge_children)
+                            parent.merge_children_names = []
+                        parent.merge_children.append(group_index)
+                        parent.merge_children_names.append(plate.long_name)
+                        plate.merge_parent = merge_index
+                        if plate.edit_out > parent.merge_out:
+                            parent.merge_out = plate.edit_out
                     else:
                         # not merged, new parent
-                        plate['merge_parent'] = None
-                        plate['merge_out'] =  plate['out']
+                        plate.merge_parent = None
+                        plate.merge_out =  plate.edit_out
                         merge_index = group_index
+                        parent = plate
 
             # sum up plates that are "included"
             for k, v in self.plate_groups.items():
-                if k not in self.merge_summary.keys():
-                    self.merge_summary[k] = []
+                summary = self.merge_summary.setdefault(k, [])
                 for plate in v:
-                    plate_index = v.index(plate)
-                    if plate['merge_parent']:
-                        pass
-                        
+                    # ! a merge_parent of 0 is falsy, children of a group's first plate are listed as well
+                    if plate.merge_parent:
+                        continue
+                    if plate.merge_children_names:
+                        summary.append('{} <- {}'.format(plate.long_name, ', '.join(plate.merge_children_names)))
                     else:
-                        if plate['merge_children_names']:
-                            self.merge_summary[k].append('{} <- {}'.format(plate['long_name'], ', '.join(plate['merge_children_names'])))
-                        else:
-                            self.merge_summary[k].append('{} ^'.format(plate['long_name']))
+                        summary.append('{} ^'.format(plate.long_name))
 
 
 selection_group = ui.HGroup({"Spacing": 5, "Weight": 0},[
@@ -328,6 +408,7 @@ selection_group = ui.HGroup({"Spacing": 5, "Weight": 0},[
         ui.HGroup({"Spacing": 5, "Weight": 0},[
             ui.Label({"Text": "Timeline Filter:", "Alignment": {"AlignLeft": True}, "Weight": 0.1,}),
             ui.LineEdit({"ID": 'include_only', "Text": "", "Weight": 0.5,}),
+            ui.Button({"ID": 'refresh_button', "Text": "Refresh", "Weight": 0}),
         ]),
         ui.HGroup({"Spacing": 5, "Weight": 0},[
             ui.Label({"Text": "Pick Master Timeline:", "Alignment": {"AlignLeft": True}, "Weight": 0.1,}),
@@ -378,6 +459,18 @@ dlg = disp.AddWindow({
                         },
     window_01)
 
+# restarted on every keystroke, the filter only runs once typing pauses
+filter_timer = ui.Timer({'ID': 'filter_timer', 'Interval': 300, 'SingleShot': True})
+
+
+def _filter_changed(ev):
+    filter_timer.Start()
+
+
+def _refresh(ev):
+    PRJ.refresh_timelines()
+    _timelines_update()
+
 
 def _timelines_update(*ev):
     itm['timelines'].Clear()
@@ -387,6 +480,9 @@ def _timelines_update(*ev):
 
 def _merge(ev):
     print(ev)
+    # a filter still waiting for typing to pause would merge the old selection
+    filter_timer.Stop()
+    _timelines_update()
     try:
         filter_color = bool(itm['skip_clip_color'].Checked)
         filtered_color = itm['clip_colors'].CurrentText
@@ -444,7 +540,9 @@ dlg.On.MyWin.Close = _exit
 dlg.On["Run"].Clicked = _run
 dlg.On["merge_button"].Clicked = _merge
 
-dlg.On['include_only'].TextChanged = _timelines_update
+dlg.On['include_only'].TextChanged = _filter_changed
+dlg.On['refresh_button'].Clicked = _refresh
+disp.On['filter_timer'].Timeout = _timelines_update
 _timelines_update()
 
 current_folder_name = str(PRJ.project_manager.GetCurrentFolder())
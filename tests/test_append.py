@@ -0,0 +1,34 @@
+import pytest
+
+import fake_resolve
+import main
+
+
+@pytest.mark.parametrize("mode", ["reject", "drop", "raise"])
+def test_only_broken_clip_infos_fail(tmp_path, mode):
+    project = fake_resolve.generate_project(timelines=3, clips=60, sources=10)
+    bmd = fake_resolve.FakeBmd(project)
+    main.bmd = bmd
+    merger = main.Merger(None)
+    merger.timeline_filter = "^cut_"
+    merger.timeline_out = "merged"
+    merger.gapsize = 10
+    merger.color_to_skip = ""
+    merger.scan_cache_dir = None
+    merger.source_store_path = None
+    merger.append_chunk_size = 7
+    pmanager, snapshot = merger.scan()
+    clip_infos = merger.compute(snapshot)
+    for info in clip_infos[3::10]:
+        info["startFrame"], info["endFrame"] = info["endFrame"] + 1, info["startFrame"]
+
+    mediapool = project.mediapool
+    mediapool.append_mode = mode
+    failed = merger.create_timeline(pmanager, snapshot, clip_infos)
+
+    broken = clip_infos[3::10]
+    assert failed == broken
+    appended = [(i["mediaPoolItem"].uid, i["startFrame"]) for i in mediapool.appended]
+    expected = [(i["source"], i["startFrame"]) for i in clip_infos if i not in broken]
+    # every good clip info exactly once
+    assert sorted(appended) == sorted(expected)
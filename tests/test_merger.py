@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import main
+
+
+def baseline_best_ranges(sets, gapsize):
+    """Merger.find_best_ranges before intervals, on sets of frames."""
+    sets = sorted(sets, key=lambda s: min(s))
+
+    best_ranges = []
+    current_range = sets[0].copy()
+    for s in sets[1:]:
+        if min(s) - max(current_range) <= gapsize:
+            current_range.update(s)
+        else:
+            best_ranges.append(list(current_range))
+            current_range = s.copy()
+    best_ranges.append(list(current_range))
+
+    best_combination = []
+    best_length = 0
+    for i in range(len(best_ranges)):
+        for j in range(i, len(best_ranges)):
+            combined_ranges = best_ranges[i : j + 1]
+            combined_length = sum(len(r) for r in combined_ranges)
+            if combined_length > best_length:
+                best_combination = combined_ranges
+                best_length = combined_length
+    return [(min(r), max(r)) for r in best_combination]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_find_best_ranges_matches_baseline(seed):
+    rnd = random.Random(seed)
+    merger = main.Merger(None)
+    merger.gapsize = rnd.choice([0, 1, 5, 10, 50])
+    usages = []
+    for _ in range(rnd.randint(1, 40)):
+        src_in = rnd.randint(0, 2000)
+        usages.append((src_in, src_in + rnd.randint(1, 200)))
+
+    sets = [set(range(i, o)) for i, o in usages]
+    intervals = [(i, o - 1) for i, o in usages]
+    assert merger.find_best_ranges(intervals) == baseline_best_ranges(
+        sets, merger.gapsize
+    )
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_occurrence_store_matches_source_usage(seed, numpy, monkeypatch):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(main, "np", None)
+    # compact every few rows to merge across compactions too
+    monkeypatch.setattr(main.OccurrenceStore, "compact_min", 4)
+    rnd = random.Random(seed)
+    store = main.OccurrenceStore()
+    usages = {}
+    for _ in range(500):
+        src_id = f"src{rnd.randrange(8)}"
+        src_in = rnd.randrange(1000)
+        src_out = src_in + rnd.choice([-20, -1, 0, 1, 5, 30])
+        store.add(src_id, src_in, src_out)
+        usages.setdefault(src_id, main.SourceUsage()).add(src_in, src_out)
+
+    expected = {
+        src_id: usage.intervals for src_id, usage in usages.items() if usage.intervals
+    }
+    assert dict(store.intervals()) == expected
+    assert len(store) < 500
+
+
+@pytest.mark.parametrize(
+    "fps, drop_frame",
+    [(23.976, False), (24, False), (25, False), (29.97, False), (29.97, True)]
+    + [(30, False), (50, False), (59.94, True), (60, False)],
+)
+def test_tc_batches_match_single_conversions(fps, drop_frame):
+    pytest.importorskip("numpy")
+    rnd = random.Random(fps)
+    tc = main.TC(fps, drop_frame)
+    frames = [0, 1, tc.time_base - 1, tc.time_base, tc.frames_per_hour]
+    frames += [rnd.randrange(tc.frames_per_hour * 24) for _ in range(500)]
+
+    tcs = tc.get_tc_batch(frames)
+    assert tcs == [tc.get_tc(f) for f in frames]
+    assert tc.get_frames_batch(tcs) == [tc.get_frames(t) for t in tcs]
@@ -0,0 +1,185 @@
+import pytest
+
+import fake_resolve
+import main
+
+
+def make_merger(tmp_path, project) -> main.Merger:
+    main.bmd = fake_resolve.FakeBmd(project)
+    merger = main.Merger(None)
+    merger.timeline_filter = "^cut_"
+    merger.timeline_out = "merged"
+    merger.gapsize = 10
+    merger.color_to_skip = "Orange"
+    merger.tracks_to_skip = ["reference"]
+    merger.scan_cache_dir = tmp_path / "scan"
+    merger.source_store_path = None
+    return merger
+
+
+def test_invalidate_keeps_the_scan_cache(tmp_path):
+    project = fake_resolve.generate_project(timelines=3, clips=30, sources=10)
+    merger = make_merger(tmp_path, project)
+    merger.scan()
+    cache_files = list((tmp_path / "scan").iterdir())
+    assert cache_files
+
+    merger.invalidate()
+    assert not merger.has_scan
+    assert all(path.exists() for path in cache_files)
+    merger.scan()
+    assert merger.get_scan_cache(project.name).stats["misses"] == 3
+
+    merger.clear_caches()
+    assert not any(path.exists() for path in cache_files)
+
+
+def test_merge_picks_up_timeline_edits(tmp_path):
+    project = fake_resolve.generate_project(timelines=3, clips=30, sources=10)
+    merger = make_merger(tmp_path, project)
+    before = merger.compute(merger.scan()[1])
+
+    item = project.timelines[0].tracks[0][1][0]
+    item.left_offset += 500
+    item.color = ""
+    after = merger.prepare_merge()[2]
+
+    fresh = make_merger(tmp_path / "fresh", project)
+    assert after == fresh.compute(fresh.scan()[1])
+    assert after != before
+
+
+def test_merge_picks_up_replaced_clips(tmp_path):
+    project = fake_resolve.generate_project(timelines=3, clips=30, sources=10)
+    merger = make_merger(tmp_path, project)
+    before = merger.compute(merger.scan()[1])
+
+    # Replace Clip keeps the timeline item, its id and offsets
+    items = [i for i in project.timelines[0].tracks[0][1] if i.mpi and not i.color]
+    items[0].mpi = next(i.mpi for i in items if i.mpi is not items[0].mpi)
+    after = merger.prepare_merge()[2]
+
+    fresh = make_merger(tmp_path / "fresh", project)
+    assert after == fresh.compute(fresh.scan()[1])
+    assert after != before
+
+def test_cancelled_merge_drops_its_report(tmp_path):
+    project = fake_resolve.generate_project(timelines=3, clips=30, sources=10)
+    merger = make_merger(tmp_path, project)
+    merger.progress.cancel()
+    with pytest.raises(main.MergeCancelled):
+        merger.prepare_merge()
+    assert merger.report is None
+
+
+def reel_project(a_end_tc=None) -> fake_resolve.FakeProject:
+    """Two pool items of reel A001: A at frames 1000-1099, B at 1090-1239."""
+    stats = fake_resolve.CallStats()
+    project = fake_resolve.FakeProject(stats, "reels")
+    pool = {}
+    for uid, head, length in (("mpi-a", 1000, 100), ("mpi-b", 1090, 150)):
+        props = {
+            "Clip Name": uid,
+            "File Name": f"{uid}.mov",
+            "File Path": f"/media/{uid}.mov",
+            "Reel Name": "A001",
+            "FPS": "24",
+            "Start TC": fake_resolve.frames_to_tc(head, 24),
+            "End TC": fake_resolve.frames_to_tc(head + length, 24),
+            "Frames": str(length),
+        }
+        pool[uid] = fake_resolve.FakeMediaPoolItem(stats, uid, uid, props)
+    if a_end_tc is not None:
+        pool["mpi-a"].props["End TC"] = a_end_tc
+
+    timeline = fake_resolve.FakeTimeline(stats, "cut_reels")
+    usages = [("mpi-a", 10, 20), ("mpi-a", 80, 20), ("mpi-b", 5, 36)]
+    items = []
+    for n, (uid, left, duration) in enumerate(usages):
+        item = fake_resolve.FakeTimelineItem(
+            stats, f"item-{n}", pool[uid], 86400 + 100 * n, left, duration
+        )
+        items.append(item)
+    timeline.tracks.append(("Video 1", items))
+    project.timelines.append(timeline)
+    return project
+
+
+def test_merged_ranges_stay_within_each_source(tmp_path):
+    merger = make_merger(tmp_path, reel_project())
+    merger.mode = "Reel Name"
+    clip_infos = merger.compute(merger.scan()[1])
+
+    # frames 1080-1130 merge into one range, A ends at 1099 and B takes over
+    assert [(i["source"], i["startFrame"], i["endFrame"]) for i in clip_infos] == [
+        ("mpi-a", 10, 29),
+        ("mpi-a", 80, 99),
+        ("mpi-b", 10, 40),
+    ]
+
+
+def test_source_without_end_tc_is_unbounded(tmp_path):
+    merger = make_merger(tmp_path, reel_project(a_end_tc=""))
+    merger.mode = "Reel Name"
+    clip_infos = merger.compute(merger.scan()[1])
+
+    assert [(i["source"], i["startFrame"], i["endFrame"]) for i in clip_infos] == [
+        ("mpi-a", 10, 29),
+        ("mpi-a", 80, 130),
+    ]
+
+
+def test_source_store_keeps_subclips_apart(tmp_path):
+    media = tmp_path / "A001.mov"
+    media.write_bytes(b"rushes")
+    projects = [reel_project(), reel_project()]
+    for n, project in enumerate(projects):
+        for timeline in project.timelines:
+            for _, items in timeline.tracks:
+                for item in items:
+                    item.mpi.props["File Path"] = str(media)
+                    # pool items of another project have other ids
+                    item.mpi.uid = f"p{n}-{item.mpi.name}"
+
+    for run, project in enumerate([projects[0], projects[0], projects[1]]):
+        merger = make_merger(tmp_path, project)
+        merger.scan_cache_dir = None
+        merger.source_store_path = tmp_path / "sources.sqlite"
+        snapshot = merger.scan()[1]
+        prefix = "p1" if run == 2 else "p0"
+        assert snapshot.sources[f"{prefix}-mpi-a"].start_tc == "00:00:41:16"
+        assert snapshot.sources[f"{prefix}-mpi-b"].start_tc == "00:00:45:10"
+        assert merger.get_source_store().stats["hits"] == (2 if run else 0)
+
+
+def test_rescan_runs_in_the_background(tmp_path):
+    project = fake_resolve.generate_project(timelines=3, clips=30, sources=10)
+    main.bmd = fake_resolve.FakeBmd(project)
+    ui = main.UI(fake_resolve.FakeFusion())
+    ui.merger.scan_cache_dir = tmp_path / "scan"
+    ui.merger.source_store_path = None
+
+    ui.rescan()
+    assert isinstance(ui.job, main.ScanJob)
+    ui.job.join()
+    ui.poll_merge()
+    assert not ui.busy
+    assert ui.merger.has_scan
+
+
+def test_rescan_can_be_cancelled(tmp_path):
+    project = fake_resolve.generate_project(
+        timelines=3, clips=30, sources=10, latency=0.01
+    )
+    main.bmd = fake_resolve.FakeBmd(project)
+    ui = main.UI(fake_resolve.FakeFusion())
+    ui.merger.scan_cache_dir = tmp_path / "scan"
+    ui.merger.source_store_path = None
+
+    ui.clear_cache()
+    ui.cancel()
+    ui.job.join()
+    assert isinstance(ui.job.error, main.MergeCancelled)
+    ui.poll_merge()
+    assert not ui.busy
+    assert not ui.merger.has_scan